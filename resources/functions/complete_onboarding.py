@@ -1,7 +1,7 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from datetime import datetime
+import lazy_init
 from aws_lambda_powertools import Logger, Tracer
 import dynamodb.tenant_management_util as tenant_management_util
 
@@ -11,17 +11,13 @@ logger = Logger()
 @tracer.capture_method
 def __complete_onboarding(event):
     try:
-        # Get tenant record.
         tenant_id = event.get('tenantId')
         logger.info('__complete_onboarding tenant_id %s:', tenant_id)
-        response = tenant_management_util.get_tenant(tenant_id)
-        item = response['Item']
 
-        # Update db record.
-        item['tenantStatus']['Onboarding Complete'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        response = tenant_management_util.update_tenant(item['tenantId'], item)
+        # Record the step in the tenant status, without reading the record first.
+        response = tenant_management_util.transition_status(tenant_id, 'Onboarding Complete')
 
-        return item
+        return response
     except Exception as e:
         raise Exception("Error complete Onboarding: ", e)
 
@@ -33,3 +29,6 @@ def lambda_handler(event, context):
         __complete_onboarding(event)
     except Exception as e:
         raise Exception("Error lambda_handler: ", e)
+
+
+lazy_init.record_init_duration('complete_onboarding')
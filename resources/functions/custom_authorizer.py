@@ -4,8 +4,11 @@
 import os
 import re
 import json
-from jose import jwt
+import hashlib
+import functools
+import lazy_init
 import idp_object_factory
+from ttl_cache import TTLCache
 from aws_lambda_powertools import Logger
 
 logger = Logger()
@@ -13,7 +16,26 @@ logger = Logger()
 sys_admin_role_name = os.environ['SYS_ADMIN_ROLE_NAME']
 idp_name = os.environ['IDP_NAME']
 idp_details=json.loads(os.environ['IDP_DETAILS'])
-idp_authorizer_service = idp_object_factory.get_idp_authorizer_object(idp_name)
+idp_authorizer_service = lazy_init.lazy(lambda: idp_object_factory.get_idp_authorizer_object(idp_name))
+
+# verified tokens are remembered per execution environment, keyed by a hash of the token,
+# until the token's exp or the configured cap, whichever comes first
+decision_cache = TTLCache(
+    max_size=int(os.environ.get('AUTHORIZER_DECISION_CACHE_MAX_SIZE', 1000)),
+    ttl_seconds=int(os.environ.get('AUTHORIZER_DECISION_CACHE_TTL_SECONDS', 300)))
+
+
+# optional per-role method lists, e.g. {"TenantAdmin": {"allow": [["GET", "/tenants"]], "deny": []}}
+role_policies = json.loads(os.environ.get('ROLE_POLICIES', '{}'))
+
+# finished policy documents per (account, API, region, stage, role); only the principalId differs
+# between the users of a role. Roles without a policy are refused first, so the dict stays small.
+policy_documents = {}
+
+
+def get_decision_cache_stats():
+    return decision_cache.stats()
+
 
 def lambda_handler(event, context):
      input_details={}
@@ -24,7 +46,17 @@ def lambda_handler(event, context):
          raise Exception('Authorization header should have a format Bearer <JWT> Token')
      jwt_bearer_token = token[1]
      logger.info("Method ARN: " + event['methodArn'])
-     
+
+     tmp = event['methodArn'].split(':')
+     api_gateway_arn_tmp = tmp[5].split('/')
+     aws_account_id = tmp[4]
+     policy_context = (aws_account_id, api_gateway_arn_tmp[0], tmp[3], api_gateway_arn_tmp[1])
+
+     cache_key = hashlib.sha256(jwt_bearer_token.encode('utf-8')).hexdigest()
+     decision = decision_cache.get(cache_key)
+     if decision is not None and decision['policyContext'] == policy_context:
+         return decision['policy']
+
      input_details['jwtToken']=jwt_bearer_token
 
      response = idp_authorizer_service.validateJWT(input_details)
@@ -37,23 +69,39 @@ def lambda_handler(event, context):
         principal_id = response["sub"]
         user_name = response["cognito:username"]
         user_role = response["custom:userRole"]
-    
-     tmp = event['methodArn'].split(':')
-     api_gateway_arn_tmp = tmp[5].split('/')
-     aws_account_id = tmp[4]    
-    
-     policy = AuthPolicy(principal_id, aws_account_id)
-     policy.restApiId = api_gateway_arn_tmp[0]
-     policy.region = tmp[3]
-     policy.stage = api_gateway_arn_tmp[1]
 
-     if (user_role != sys_admin_role_name):
-         logger.error('Unauthorized')
-         return Exception('Unauthorized')
-
-     policy.allowAllMethods()
-     
-     return policy.build()
+     policy_key = policy_context + (user_role,)
+     policy_document = policy_documents.get(policy_key)
+     if policy_document is None:
+         policy = AuthPolicy(principal_id, aws_account_id)
+         policy.restApiId = api_gateway_arn_tmp[0]
+         policy.region = tmp[3]
+         policy.stage = api_gateway_arn_tmp[1]
+
+         if (user_role == sys_admin_role_name):
+             policy.allowAllMethods()
+         elif (user_role in role_policies):
+             policy.addRolePolicy(role_policies[user_role])
+         else:
+             logger.error('Unauthorized')
+             return Exception('Unauthorized')
+
+         policy_document = policy.build()['policyDocument']
+         policy_documents[policy_key] = policy_document
+
+     # the policy document is shared between responses and must not be modified
+     auth_response = {
+         'principalId': principal_id,
+         'policyDocument': policy_document
+     }
+     decision_cache.put(cache_key, {
+         'claims': response,
+         'policy': auth_response,
+         'policyContext': policy_context,
+     }, expires_at=response['exp'])
+     logger.info({'decisionCacheStats': decision_cache.stats()})
+
+     return auth_response
 
 class HttpVerb:
     GET     = "GET"
@@ -103,20 +151,14 @@ class AuthPolicy(object):
         statement can be null."""
         if verb != "*" and not hasattr(HttpVerb, verb):
             raise NameError("Invalid HTTP verb " + verb + ". Allowed verbs in HttpVerb class")
-        resourcePattern = re.compile(self.pathRegex)
-        if not resourcePattern.match(resource):
+        if not _compilePathRegex(self.pathRegex).match(resource):
             raise NameError("Invalid resource path: " + resource + ". Path should match " + self.pathRegex)
 
         if resource[:1] == "/":
             resource = resource[1:]
 
-        resourceArn = ("arn:aws:execute-api:" +
-            self.region + ":" +
-            self.awsAccountId + ":" +
-            self.restApiId + "/" +
-            self.stage + "/" +
-            verb + "/" +
-            resource)
+        resourceArn = "arn:aws:execute-api:{}:{}:{}/{}/{}/{}".format(
+            self.region, self.awsAccountId, self.restApiId, self.stage, verb, resource)
 
         if effect.lower() == "allow":
             self.allowMethods.append({
@@ -191,6 +233,14 @@ class AuthPolicy(object):
         conditions here: http://docs.aws.amazon.com/IAM/latest/UserGuide/reference_policies_elements.html#Condition"""
         self._addMethod("Deny", verb, resource, conditions)
 
+    def addRolePolicy(self, rolePolicy):
+        """Adds the allowed and denied methods of a role policy. A role policy is a dict
+        with optional 'allow' and 'deny' lists of [verb, resource] pairs."""
+        for verb, resource in rolePolicy.get('allow', []):
+            self.allowMethod(verb, resource)
+        for verb, resource in rolePolicy.get('deny', []):
+            self.denyMethod(verb, resource)
+
     def build(self):
         """Generates the policy document based on the internal lists of allowed and denied
         conditions. This will generate a policy with two main statements for the effect:
@@ -211,4 +261,16 @@ class AuthPolicy(object):
         policy['policyDocument']['Statement'].extend(self._getStatementForEffect("Allow", self.allowMethods))
         policy['policyDocument']['Statement'].extend(self._getStatementForEffect("Deny", self.denyMethods))
 
-        return policy
\ No newline at end of file
+        return policy
+
+
+@functools.lru_cache(maxsize=None)
+def _compilePathRegex(pathRegex):
+    return re.compile(pathRegex)
+
+
+# fail at init, not per request, on a malformed role policy
+for role_name, role_policy in role_policies.items():
+    AuthPolicy(role_name, '*').addRolePolicy(role_policy)
+
+lazy_init.record_init_duration('custom_authorizer')
@@ -2,9 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 # import json
-import os
-
-import boto3
+import lazy_init
 from aws_lambda_powertools import Logger, Tracer
 
 # from aws_lambda_powertools.logging import correlation_paths
@@ -14,12 +12,6 @@ from aws_lambda_powertools import Logger, Tracer
 tracer = Tracer()
 logger = Logger()
 
-event_bus = boto3.client('events')
-eventbus_name = os.environ['EVENTBUS_NAME']
-event_source = os.environ['EVENT_SOURCE']
-dynamodb = boto3.resource('dynamodb')
-tenant_details_table = dynamodb.Table(os.environ['TENANT_DETAILS_TABLE'])
-
 
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
@@ -28,3 +20,6 @@ def lambda_handler(event, context):
         logger.info('lambda_handler context %s:', context)
     except Exception as e:
         raise Exception("Error error_handler: ", e)
+
+
+lazy_init.record_init_duration('error_handler')
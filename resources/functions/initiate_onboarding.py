@@ -1,8 +1,7 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-import os
-import boto3
+import lazy_init
 from aws_lambda_powertools import Logger, Tracer
 from datetime import datetime
 import dynamodb.tenant_management_util as tenant_management_util
@@ -10,12 +9,6 @@ import dynamodb.tenant_management_util as tenant_management_util
 tracer = Tracer()
 logger = Logger()
 
-event_bus = boto3.client('events')
-eventbus_name = os.environ['EVENTBUS_NAME']
-event_source = os.environ['EVENT_SOURCE']
-dynamodb = boto3.resource('dynamodb')
-tenant_details_table = dynamodb.Table(os.environ['TENANT_DETAILS_TABLE'])
-
 
 @tracer.capture_method
 def __initiate_onboarding(event):
@@ -40,3 +33,6 @@ def lambda_handler(event, context):
         return response
     except Exception as e:
         raise Exception("Error lambda_handler: ", e)
+
+
+lazy_init.record_init_duration('initiate_onboarding')
@@ -1,6 +1,6 @@
-import os
+import lazy_init
+import aws_clients
 import json
-import boto3
 import dynamodb.tenant_management_util as tenant_management_util
 from aws_lambda_powertools import Logger, Tracer
 
@@ -8,9 +8,7 @@ tracer = Tracer()
 logger = Logger()
 
 # Initialize the Boto3 Step Functions client
-sfn_client = boto3.client('stepfunctions')
-dynamodb = boto3.resource('dynamodb')
-tenant_details_table = dynamodb.Table(os.environ['TENANT_DETAILS_TABLE'])
+sfn_client = lazy_init.lazy(lambda: aws_clients.get_client('stepfunctions'))
 
 
 def lambda_handler(event, context):
@@ -25,7 +23,8 @@ def lambda_handler(event, context):
         tenant_id = detail.get('tenantId')
 
         # Get task token and tenant details from db.
-        response = tenant_management_util.get_tenant(tenant_id)
+        # the task token was just written by another function, read it consistently
+        response = tenant_management_util.get_tenant(tenant_id, consistent_read=True)
         logger.info('Get tenant_details success: %s', response)
         item = response['Item']
         task_token = item['taskToken']
@@ -53,3 +52,6 @@ def lambda_handler(event, context):
     except Exception as e:
         logger.info('Get tenant_details error: %s', e)
         raise Exception('Error sending task response', e)
+
+
+lazy_init.record_init_duration('onboarding_events_handler')
@@ -1,9 +1,10 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import lazy_init
+import aws_clients
 import os
 import json
-import boto3
 import dynamodb.tenant_management_util as tenant_management_util
 from aws_lambda_powertools import Logger, Tracer
 from datetime import datetime
@@ -12,19 +13,20 @@ from models.control_plane_event_types import ControlPlaneEventTypes
 tracer = Tracer()
 logger = Logger()
 
-event_bus = boto3.client('events')
+event_bus = lazy_init.lazy(lambda: aws_clients.get_client('events'))
 eventbus_name = os.environ['EVENTBUS_NAME']
 event_source = os.environ['EVENT_SOURCE']
 
 
 def __provision_onboarding(event):
     try:
-        # Update db record.
+        # Update db record, only the status step and the task token change.
         item = event['previousOutput']['Payload']
         item['taskToken'] = event['taskToken']
-        # now = datetime.now()
         item['tenantStatus']['Provision Onboarding'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        response = tenant_management_util.update_tenant(item['tenantId'], item)
+        response = tenant_management_util.transition_status(
+            item['tenantId'], 'Provision Onboarding', {'taskToken': item['taskToken']},
+            timestamp=item['tenantStatus']['Provision Onboarding'])
 
         # Publish event to EventBridge.
         __create_control_plane_event(
@@ -58,3 +60,6 @@ def lambda_handler(event, context):
         return response
     except Exception as e:
         raise Exception("Error lambda_handler: ", e)
+
+
+lazy_init.record_init_duration('provision_onboarding')
@@ -4,19 +4,26 @@
 import boto3  # relying on lambda runtime to provide boto3 https://docs.aws.amazon.com/lambda/latest/dg/lambda-runtimes.html
 import botocore  # relying on lambda runtime to provide botocore https://docs.aws.amazon.com/lambda/latest/dg/lambda-runtimes.html
 from boto3.dynamodb.conditions import Key
+import hashlib
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from http import HTTPStatus
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools import Tracer
 from aws_lambda_powertools.logging import correlation_paths
 from aws_lambda_powertools.event_handler import (
-    APIGatewayRestResolver, CORSConfig
+    APIGatewayRestResolver, CORSConfig, Response
 )
+from aws_lambda_powertools.event_handler import content_types
 from aws_lambda_powertools.event_handler.exceptions import (
     BadRequestError,
     InternalServerError,
     NotFoundError,
 )
+from aws_lambda_powertools.shared.json_encoder import Encoder
 
 cors_config = CORSConfig(allow_origin="*", max_age=300)
 app = APIGatewayRestResolver(cors=cors_config)
@@ -28,9 +35,175 @@ tenant_config_index_name = os.environ['TENANT_CONFIG_INDEX_NAME']
 tenant_name_column = os.environ['TENANT_NAME_COLUMN']
 tenant_config_column = os.environ['TENANT_CONFIG_COLUMN']
 tenant_details_table_handler = dynamodb.Table(tenant_details_table)
+# optional index of tenant hostnames (custom domains included) kept by the control plane
+tenant_hostnames_table = os.environ.get('TENANT_HOSTNAMES_TABLE')
+tenant_hostnames_table_handler = dynamodb.Table(tenant_hostnames_table) if tenant_hostnames_table else None
+
+
+class TenantConfigCache:
+    """Bounded LRU cache of tenant configs by tenant name or hostname. Configs expire after
+    ttl_seconds, names without a tenant are remembered for negative_ttl_seconds so unknown
+    hostnames do not reach DynamoDB on every request. Concurrent misses for the same name
+    share a single lookup. Lookup errors are never cached."""
+
+    def __init__(self, max_size, ttl_seconds, negative_ttl_seconds):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, name, loader):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            lookup = self._in_flight.get(name)
+            leader = lookup is None
+            if leader:
+                lookup = self._in_flight[name] = {'done': threading.Event()}
+
+        if not leader:
+            lookup['done'].wait()
+            if 'error' in lookup:
+                raise lookup['error']
+            return lookup['value']
+
+        try:
+            value = loader(name)
+            lookup['value'] = value
+            self._put(name, value)
+            return value
+        except Exception as e:
+            lookup['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[name]
+            lookup['done'].set()
+
+    def _put(self, name, value):
+        ttl_seconds = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        if self.max_size <= 0 or ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[name] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+tenant_config_cache = TenantConfigCache(
+    max_size=int(os.environ.get('TENANT_CONFIG_CACHE_MAX_SIZE', 1024)),
+    ttl_seconds=float(os.environ.get('TENANT_CONFIG_CACHE_TTL_SECONDS', 60)),
+    negative_ttl_seconds=float(os.environ.get('TENANT_CONFIG_NEGATIVE_CACHE_TTL_SECONDS', 10)),
+)
+
+
+class HostnameSnapshot:
+    """The whole hostname index held in memory, for fleets small enough to scan it in one
+    go. It is reloaded once older than ttl_seconds, so hostnames added meanwhile resolve
+    through the tenant name fallback until then. A failed reload keeps serving the previous
+    snapshot."""
+
+    def __init__(self, table, ttl_seconds):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self._entries = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, hostname):
+        with self._lock:
+            if self._expires <= time.monotonic():
+                self._reload()
+            return self._entries.get(hostname)
+
+    def _reload(self):
+        try:
+            entries = {}
+            scan_kwargs = {
+                "ProjectionExpression": "#h, #c",
+                "ExpressionAttributeNames": {"#h": "hostname", "#c": tenant_config_column},
+            }
+            while True:
+                response = self.table.scan(**scan_kwargs)
+                for item in response["Items"]:
+                    entries[item["hostname"]] = item
+                if not response.get("LastEvaluatedKey"):
+                    break
+                scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except botocore.exceptions.ClientError as error:
+            if self._entries is None:
+                raise
+            logger.warning(f"Keeping the previous hostname snapshot, reload failed: {error}")
+        else:
+            self._entries = entries
+            logger.info(f"Loaded hostname snapshot with {len(entries)} hostnames")
+        self._expires = time.monotonic() + self.ttl_seconds
+
+
+hostname_snapshot_ttl_seconds = float(os.environ.get('TENANT_HOSTNAMES_SNAPSHOT_TTL_SECONDS', 0))
+hostname_snapshot = HostnameSnapshot(tenant_hostnames_table_handler, hostname_snapshot_ttl_seconds) \
+    if tenant_hostnames_table and hostname_snapshot_ttl_seconds > 0 else None
+
+
+# max-age of 0 makes clients revalidate with If-None-Match on every use
+cache_control_max_age = int(os.environ.get('TENANT_CONFIG_CACHE_CONTROL_MAX_AGE_SECONDS', 60))
+cache_control = f"public, max-age={cache_control_max_age}" if cache_control_max_age > 0 else "no-cache"
 
 
 def _get_tenant_config(name):
+    return tenant_config_cache.get_or_load(name, _load_tenant_config)
+
+
+def _load_tenant_config(name):
+    return _render_tenant_config(_query_tenant_config(name))
+
+
+def _get_tenant_config_by_hostname(hostname):
+    return tenant_config_cache.get_or_load(("hostname", hostname), _load_tenant_config_by_hostname)
+
+
+def _load_tenant_config_by_hostname(key):
+    _, hostname = key
+    if hostname_snapshot is not None:
+        item = hostname_snapshot.get(hostname)
+    else:
+        item = tenant_hostnames_table_handler.get_item(
+            Key={"hostname": hostname},
+            ProjectionExpression="#c",
+            ExpressionAttributeNames={"#c": tenant_config_column},
+        ).get("Item")
+    if item is not None:
+        return _render_tenant_config(item.get(tenant_config_column, None))
+
+    # hostnames missing from the index fall back to the <tenant name>.<domain> scheme
+    return _get_tenant_config(hostname.split(".")[0])
+
+
+def _render_tenant_config(tenant_config):
+    if tenant_config is None:
+        return None
+
+    # tenantConfig is normally stored as a JSON string and is sent as is, like the resolver
+    # does with string results; other values are serialized the way the resolver would.
+    # The ETag is a hash of the exact response body and is computed once per cached config.
+    if isinstance(tenant_config, str):
+        body = tenant_config
+    else:
+        body = json.dumps(tenant_config, separators=(",", ":"), cls=Encoder)
+    etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest() + '"'
+    return {"body": body, "etag": etag}
+
+
+def _query_tenant_config(name):
     response = tenant_details_table_handler.query(
         IndexName=tenant_config_index_name,
         KeyConditionExpression=Key(tenant_name_column).eq(name),
@@ -42,21 +215,41 @@ def _get_tenant_config(name):
     return tenant_config.get(tenant_config_column, None)
 
 
-def _get_tenant_config_for_tenant(name):
+def _get_tenant_config_for_tenant(name, vary=None, by_hostname=False):
     try:
-        tenant_config = _get_tenant_config(name)
+        tenant_config = _get_tenant_config_by_hostname(name) if by_hostname else _get_tenant_config(name)
         logger.info(f"tenant_config: {tenant_config}")
         if tenant_config is None:
             logger.error(f"No tenant details found for {name}")
             raise NotFoundError(f"No tenant details found for {name}")
         logger.info(
-            f"Tenant config found for {name} - {tenant_config}")
-
-        return tenant_config, HTTPStatus.OK.value
+            f"Tenant config found for {name} - {tenant_config['body']}")
     except botocore.exceptions.ClientError as error:
         logger.error(error)
         raise InternalServerError("Unknown error during processing!")
 
+    headers = {"ETag": tenant_config["etag"], "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    if _etag_matches(app.current_event.get_header_value(name="If-None-Match"), tenant_config["etag"]):
+        logger.info(f"Tenant config for {name} not modified")
+        return Response(status_code=HTTPStatus.NOT_MODIFIED.value, headers=headers)
+
+    return Response(
+        status_code=HTTPStatus.OK.value,
+        content_type=content_types.APPLICATION_JSON,
+        body=tenant_config["body"],
+        headers=headers,
+    )
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixed tags match as well
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
 
 @app.get("/tenant-config/<tenant_name>")
 @tracer.capture_method
@@ -80,13 +273,19 @@ def get_tenant_config_via_header():
 
     hostname = origin_header.split("://")[1]
     logger.info(f"hostname: {hostname}")
+    if tenant_hostnames_table:
+        hostname = hostname.split(":")[0].lower().rstrip(".")
+        # the config depends on the Origin header, shared caches must key on it
+        return _get_tenant_config_for_tenant(hostname, vary="Origin", by_hostname=True)
+
     tenant_name = hostname.split(".")[0]
     logger.info(f"tenant_name: {tenant_name}")
     if tenant_name is None:
         logger.error(f"Unable to parse tenant name!")
         raise BadRequestError(f"Unable to parse tenant name!")
 
-    return _get_tenant_config_for_tenant(tenant_name)
+    # the config depends on the Origin header, shared caches must key on it
+    return _get_tenant_config_for_tenant(tenant_name, vary="Origin")
 
 
 @logger.inject_lambda_context(
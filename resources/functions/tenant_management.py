@@ -1,15 +1,24 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import lazy_init
+import aws_clients
+import pagination
+import ndjson
+import throttling
+import dynamodb.expression_builder as expression_builder
+import dynamodb.tenant_management_util as tenant_management_util
 import json
+import simplejson
 import os
 from http import HTTPStatus
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.event_handler import (APIGatewayRestResolver,
                                                  CORSConfig)
+from aws_lambda_powertools.event_handler.exceptions import BadRequestError, ServiceError
 from aws_lambda_powertools.logging import correlation_paths
 from models.control_plane_event_types import ControlPlaneEventTypes
 
@@ -19,13 +28,25 @@ logger = Logger()
 cors_config = CORSConfig(allow_origin="*", max_age=300)
 app = APIGatewayRestResolver(cors=cors_config)
 
-event_bus = boto3.client('events')
+event_bus = lazy_init.lazy(lambda: aws_clients.get_client('events'))
 eventbus_name = os.environ['EVENTBUS_NAME']
 event_source = os.environ['EVENT_SOURCE']
-dynamodb = boto3.resource('dynamodb')
-tenant_details_table = dynamodb.Table(os.environ['TENANT_DETAILS_TABLE'])
+tenant_details_table = lazy_init.lazy(lambda: aws_clients.get_table(os.environ['TENANT_DETAILS_TABLE']))
 onboarding_state_machine_arn = os.environ['ONBOARDING_STATE_MACHINE_ARN']
 
+# attributes returned by GET /tenants unless the request asks for others with fields=
+tenant_list_default_fields = ['tenantId', 'tenantName', 'email', 'tier', 'isActive']
+
+tenant_batch_required_fields = ['tenantName', 'email']
+tenant_batch_max_size = int(os.environ.get('TENANT_BATCH_MAX_SIZE', 100))
+tenant_batch_max_workers = int(os.environ.get('TENANT_BATCH_MAX_WORKERS', 10))
+# client-side cap on onboarding starts, shared by every request served by this container
+onboarding_rate_limiter = throttling.RateLimiter(
+    float(os.environ.get('TENANT_BATCH_START_RATE_PER_SECOND', 25)))
+tenant_lifecycle_batch_max_size = int(os.environ.get('TENANT_LIFECYCLE_BATCH_MAX_SIZE', 1000))
+# PutEvents accepts up to 10 entries per call
+EVENT_BATCH_SIZE = 10
+
 
 @app.post("/tenants")
 @tracer.capture_method
@@ -36,6 +57,16 @@ def create_tenant():
 
     logger.info("Request received to create new tenant")
 
+    try:
+        hostnames = tenant_management_util.normalize_hostnames(input_details.get('hostnames'))
+    except ValueError as e:
+        raise BadRequestError(str(e))
+    # hostnames are claimed when onboarding writes the tenant, refuse taken ones up front
+    claimed = tenant_management_util.find_claimed_hostnames(hostnames)
+    if claimed:
+        raise ServiceError(HTTPStatus.CONFLICT.value,
+                           'Hostname {} belongs to another tenant'.format(next(iter(claimed))))
+
     try:
         for key, value in input_details.items():
             input_item[key] = value
@@ -43,8 +74,7 @@ def create_tenant():
         input_item['isActive'] = True
 
         # Start Onboarding state machine execution.
-        stepfunctions_client = boto3.client('stepfunctions')
-        response = stepfunctions_client.start_execution(
+        response = aws_clients.get_client('stepfunctions').start_execution(
             stateMachineArn=onboarding_state_machine_arn, input=json.dumps(input_details)
         )
         logger.info("response success, %s", response)
@@ -54,16 +84,264 @@ def create_tenant():
         return "New tenant created", HTTPStatus.OK
 
 
+@app.post("/tenants/batch")
+@tracer.capture_method
+def create_tenants_batch():
+    logger.info("Request received to create a batch of tenants")
+    body = app.current_event.json_body
+    tenants = body.get('tenants') if isinstance(body, dict) else None
+
+    # nothing is started unless every tenant of the batch is valid
+    errors = __validate_tenant_batch(tenants)
+    if errors:
+        return {'message': 'Invalid tenant batch', 'errors': errors}, HTTPStatus.BAD_REQUEST
+    conflicts = __find_batch_hostname_conflicts(tenants)
+    if conflicts:
+        return {'message': 'Hostnames already in use', 'errors': conflicts}, HTTPStatus.CONFLICT
+
+    batch = [{**tenant, 'tenantId': str(uuid.uuid4())} for tenant in tenants]
+    with ThreadPoolExecutor(max_workers=min(tenant_batch_max_workers, len(batch))) as executor:
+        results = list(executor.map(__start_batch_onboarding, range(len(batch)), batch))
+
+    failed = sum(1 for result in results if 'error' in result)
+    logger.info({'message': 'Tenant batch processed', 'succeeded': len(results) - failed, 'failed': failed})
+    return {'results': results, 'succeeded': len(results) - failed, 'failed': failed}, HTTPStatus.OK
+
+
+def __validate_tenant_batch(tenants):
+    if not isinstance(tenants, list) or not tenants:
+        return [{'error': 'tenants must be a non-empty list'}]
+    if len(tenants) > tenant_batch_max_size:
+        return [{'error': 'A batch accepts at most {} tenants'.format(tenant_batch_max_size)}]
+
+    errors = []
+    tenant_names = set()
+    for index, tenant in enumerate(tenants):
+        if not isinstance(tenant, dict):
+            errors.append({'index': index, 'error': 'tenant must be an object'})
+            continue
+        missing = [field for field in tenant_batch_required_fields if not tenant.get(field)]
+        if missing:
+            errors.append({'index': index, 'error': 'missing ' + ', '.join(missing)})
+        elif tenant['tenantName'] in tenant_names:
+            errors.append({'index': index, 'error': 'duplicate tenantName ' + str(tenant['tenantName'])})
+        else:
+            tenant_names.add(tenant['tenantName'])
+            try:
+                tenant_management_util.normalize_hostnames(tenant.get('hostnames'))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+    return errors
+
+
+def __find_batch_hostname_conflicts(tenants):
+    # hostnames taken by an existing tenant or requested by more than one tenant of the batch
+    requested_by = {}
+    conflicts = []
+    for index, tenant in enumerate(tenants):
+        for hostname in tenant_management_util.normalize_hostnames(tenant.get('hostnames')):
+            if hostname in requested_by:
+                conflicts.append({'index': index, 'error': 'hostname {} is also requested by tenant {}'.format(
+                    hostname, requested_by[hostname])})
+            else:
+                requested_by[hostname] = index
+    claimed = tenant_management_util.find_claimed_hostnames(list(requested_by))
+    conflicts.extend({'index': requested_by[hostname], 'error': 'hostname {} belongs to another tenant'.format(hostname)}
+                     for hostname in claimed)
+    return conflicts
+
+
+def __start_batch_onboarding(index, input_details):
+    # The tenantId doubles as the execution name, which makes retried starts of the same
+    # tenant idempotent on the Step Functions side.
+    def start_execution():
+        return aws_clients.get_client('stepfunctions').start_execution(
+            stateMachineArn=onboarding_state_machine_arn,
+            name=input_details['tenantId'],
+            input=json.dumps(input_details))
+
+    result = {'index': index, 'tenantId': input_details['tenantId']}
+    try:
+        onboarding_rate_limiter.acquire()
+        result['executionArn'] = throttling.call_with_backoff(start_execution)['executionArn']
+    except Exception as e:
+        logger.exception("Error starting onboarding for tenant %s", input_details['tenantId'])
+        result['error'] = str(e)
+    return result
+
+
+# registered before the /tenants/<tenantId>/... routes, which would match them too
+@app.post("/tenants/batch/activate")
+@tracer.capture_method
+def activate_tenants_batch():
+    logger.info("Request received to activate a batch of tenants")
+    return __apply_tenant_lifecycle_batch(
+        "set isActive = :isActive", {':isActive': True}, ControlPlaneEventTypes.ACTIVATE.value,
+        read_tenants=True)
+
+
+@app.post("/tenants/batch/deactivate")
+@tracer.capture_method
+def deactivate_tenants_batch():
+    logger.info("Request received to deactivate a batch of tenants")
+    return __apply_tenant_lifecycle_batch(
+        "set isActive = :isActive", {':isActive': False}, ControlPlaneEventTypes.DEACTIVATE.value,
+        read_tenants=False)
+
+
+@app.post("/tenants/batch/offboard")
+@tracer.capture_method
+def offboard_tenants_batch():
+    logger.info("Request received to offboard a batch of tenants")
+    return __apply_tenant_lifecycle_batch(
+        "set tenantStatus = :tenantStatus", {':tenantStatus': 'Deleting'},
+        ControlPlaneEventTypes.OFFBOARDING.value, read_tenants=True)
+
+
+def __apply_tenant_lifecycle_batch(update_expression, expression_attribute_values, event_type, read_tenants):
+    # Like the single tenant routes, activate and offboard events carry the updated tenant
+    # item, deactivate events only the tenantId.
+    tenant_ids, errors = __resolve_tenant_batch(app.current_event.json_body)
+    if errors:
+        return {'message': 'Invalid tenant batch', 'errors': errors}, HTTPStatus.BAD_REQUEST
+
+    update_errors = tenant_management_util.transact_update_tenants(
+        tenant_ids, update_expression, expression_attribute_values)
+    updated = [tenant_id for tenant_id in tenant_ids if update_errors[tenant_id] is None]
+    unread = set()
+    if read_tenants:
+        tenants, unread_ids = tenant_management_util.batch_get_tenants(updated)
+        unread = set(unread_ids)
+    else:
+        tenants = {tenant_id: {'tenantId': tenant_id} for tenant_id in updated}
+    event_errors = __publish_control_plane_events(tenants, event_type)
+
+    results = []
+    for tenant_id in tenant_ids:
+        result = {'tenantId': tenant_id, 'updated': update_errors[tenant_id] is None}
+        if update_errors[tenant_id] is not None:
+            result['error'] = update_errors[tenant_id]
+        elif tenant_id in unread:
+            result['error'] = 'Tenant updated but could not be read back, no event sent'
+        elif tenant_id not in tenants:
+            result['error'] = 'Tenant not found after the update, no event sent'
+        elif tenant_id in event_errors:
+            result['error'] = 'Event not sent: ' + event_errors[tenant_id]
+        results.append(result)
+
+    failed = sum(1 for result in results if 'error' in result)
+    logger.info({'message': 'Tenant lifecycle batch processed', 'eventType': event_type,
+                 'succeeded': len(results) - failed, 'failed': failed})
+    return {'results': results, 'succeeded': len(results) - failed, 'failed': failed}, HTTPStatus.OK
+
+
+def __resolve_tenant_batch(body):
+    # returns (tenant ids, None) or (None, errors)
+    body = body if isinstance(body, dict) else {}
+    tenant_ids = body.get('tenantIds')
+    conditions = body.get('filter')
+    if (tenant_ids is None) == (conditions is None):
+        return None, [{'error': 'Provide either tenantIds or filter'}]
+
+    if tenant_ids is not None:
+        if (not isinstance(tenant_ids, list) or not tenant_ids
+                or not all(isinstance(tenant_id, str) and tenant_id for tenant_id in tenant_ids)):
+            return None, [{'error': 'tenantIds must be a non-empty list of tenant ids'}]
+        tenant_ids = list(dict.fromkeys(tenant_ids))
+    else:
+        try:
+            tenant_ids = tenant_management_util.find_tenant_ids(conditions, tenant_lifecycle_batch_max_size)
+        except expression_builder.InvalidExpressionParameter as e:
+            return None, [{'error': str(e)}]
+
+    if len(tenant_ids) > tenant_lifecycle_batch_max_size:
+        return None, [{'error': 'A batch accepts at most {} tenants'.format(tenant_lifecycle_batch_max_size)}]
+    return tenant_ids, None
+
+
+def __publish_control_plane_events(details_by_tenant, eventType):
+    # Sends one event per tenant in PutEvents calls of EVENT_BATCH_SIZE entries.
+    # Returns {tenantId: error} for the events that were not accepted.
+    entries = [(tenant_id, {
+        'EventBusName': eventbus_name,
+        'Source': event_source,
+        'DetailType': eventType,
+        'Detail': simplejson.dumps(details, use_decimal=True),
+    }) for tenant_id, details in details_by_tenant.items()]
+
+    errors = {}
+    for start in range(0, len(entries), EVENT_BATCH_SIZE):
+        chunk = entries[start:start + EVENT_BATCH_SIZE]
+        try:
+            response = throttling.call_with_backoff(
+                lambda: event_bus.put_events(Entries=[entry for _, entry in chunk]))
+        except Exception as e:
+            logger.exception("Error publishing %s events", eventType)
+            errors.update({tenant_id: str(e) for tenant_id, _ in chunk})
+            continue
+        for (tenant_id, _), result in zip(chunk, response['Entries']):
+            if 'ErrorCode' in result:
+                errors[tenant_id] = result.get('ErrorMessage') or result['ErrorCode']
+    return errors
+
+
 @app.get("/tenants")
 @tracer.capture_method
 def get_tenants():
-    logger.info("Request received to get all tenants")
+    logger.info("Request received to get tenants")
+    limit_value = app.current_event.get_query_string_value('limit')
+    stream = ndjson.accepts_ndjson(app.current_event.headers)
     try:
-        response = tenant_details_table.scan()
+        if stream:
+            # NDJSON responses are bounded by their size, limit only applies when given
+            limit = pagination.parse_limit(limit_value, maximum=ndjson.MAX_RECORDS) if limit_value else None
+        else:
+            limit = pagination.parse_limit(limit_value)
+        exclusive_start_key = pagination.decode_next_token(
+            app.current_event.get_query_string_value('nextToken'), 'tenants')
+        fields = expression_builder.parse_fields(
+            app.current_event.get_query_string_value('fields'),
+            default=tenant_list_default_fields, required=['tenantId'])
+    except (pagination.InvalidPaginationParameter, expression_builder.InvalidExpressionParameter) as e:
+        raise BadRequestError(str(e))
+
+    scan_kwargs = expression_builder.build_projection(fields)
+    if exclusive_start_key:
+        scan_kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    try:
+        if stream:
+            return __stream_tenants(scan_kwargs, limit)
+        response = tenant_details_table.scan(Limit=limit, **scan_kwargs)
     except Exception as e:
-        raise Exception('Error getting all tenants', e)
+        raise Exception('Error getting tenants', e)
     else:
-        return response['Items'], HTTPStatus.OK
+        return {
+            'data': response['Items'],
+            'nextToken': pagination.encode_next_token(response.get('LastEvaluatedKey'), 'tenants'),
+        }, HTTPStatus.OK
+
+
+def __stream_tenants(scan_kwargs, max_records):
+    # Writes scan pages to the NDJSON body as they arrive. When the size cap is hit mid
+    # page, the next token resumes the scan after the last tenant that was written.
+    # Pages are kept to MAX_PAGE_SIZE items, so little is read past the size cap.
+    writer = ndjson.NdjsonWriter(max_records=max_records)
+    last_written_key = scan_kwargs.get('ExclusiveStartKey')
+    while True:
+        scan_kwargs['Limit'] = pagination.MAX_PAGE_SIZE
+        if max_records:
+            scan_kwargs['Limit'] = min(scan_kwargs['Limit'], max_records - writer.count)
+        response = tenant_details_table.scan(**scan_kwargs)
+        for item in response['Items']:
+            if not writer.add(item):
+                return writer.response(pagination.encode_next_token(last_written_key, 'tenants'))
+            last_written_key = {'tenantId': item['tenantId']}
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key or writer.is_full():
+            return writer.response(pagination.encode_next_token(last_evaluated_key, 'tenants'))
+        scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
 
 
 @app.get("/tenants/<tenantId>")
@@ -71,10 +349,17 @@ def get_tenants():
 def get_tenant(tenantId):
     logger.info("Request received to get a tenant")
     try:
-        response = tenant_details_table.get_item(Key={'tenantId': tenantId})
+        fields = expression_builder.parse_fields(
+            app.current_event.get_query_string_value('fields'), required=['tenantId'])
+    except expression_builder.InvalidExpressionParameter as e:
+        raise BadRequestError(str(e))
+
+    try:
+        response = tenant_management_util.get_tenant(tenantId, fields=fields)
     except Exception as e:
         raise Exception('Error getting tenant', e)
     else:
+        logger.info({'tenantCacheStats': tenant_management_util.get_tenant_cache_stats()})
         return response['Item'], HTTPStatus.OK
 
 
@@ -86,6 +371,8 @@ def update_tenant(tenantId):
 
     try:
         __update_tenant(tenantId, input_details)
+    except ServiceError:
+        raise
     except Exception as e:
         raise Exception("Error updating a tenant", e)
     else:
@@ -99,38 +386,33 @@ def delete_tenant(tenantId):
     input_details = {**app.current_event.json_body, 'tenantStatus': 'Deleting'}
 
     try:
-        __update_tenant(tenantId, input_details)
+        response = __update_tenant(tenantId, input_details, return_values='ALL_NEW')
+        # the event carries the updated tenant, as the batch offboard and activate routes do;
+        # an update written with the hostname index returns no attributes
+        tenant = response.get('Attributes') or \
+            tenant_management_util.get_tenant(tenantId, consistent_read=True).get('Item')
         __create_control_plane_event(
-            json.dumps(input_details), ControlPlaneEventTypes.OFFBOARDING.value)
+            simplejson.dumps(tenant, use_decimal=True), ControlPlaneEventTypes.OFFBOARDING.value)
+    except ServiceError:
+        raise
     except Exception as e:
         raise Exception("Error deleting a tenant", e)
     else:
         return 'Successsfuly sent offboarding message to application plane', HTTPStatus.OK
 
 
-def __update_tenant(tenantId, tenant):
-    # Remove the tenantId if the incoming object has one
-    input_details = {key: tenant[key] for key in tenant if key != 'tenantId'}
-    update_expression = []
-    update_expression.append("set ")
-    expression_attribute_values = {}
-    for key, value in input_details.items():
-        key_variable = f":{key}Variable"
-        update_expression.append(''.join([key, " = ", key_variable]))
-        update_expression.append(",")
-        expression_attribute_values[key_variable] = value
-
-    # remove the last comma
-    update_expression.pop()
-
-    response_update = tenant_details_table.update_item(
-        Key={
-            'tenantId': tenantId,
-        },
-        UpdateExpression=''.join(update_expression),
-        ExpressionAttributeValues=expression_attribute_values,
-        ReturnValues="UPDATED_NEW"
-    )
+def __update_tenant(tenantId, tenant, return_values='NONE'):
+    # The body always wins, as clients have no version of the tenant to diff against.
+    # Reading one here would cost a round trip on every write to save only no-op writes.
+    try:
+        tenant_management_util.normalize_hostnames(tenant.get('hostnames'))
+    except ValueError as e:
+        raise BadRequestError(str(e))
+
+    try:
+        return tenant_management_util.update_tenant(tenantId, tenant, return_values=return_values)
+    except tenant_management_util.TenantConflictError as e:
+        raise ServiceError(HTTPStatus.CONFLICT.value, str(e))
 
 
 @app.put("/tenants/<tenantId>/deactivate")
@@ -149,6 +431,7 @@ def deactivate_tenant(tenantId):
             },
             ReturnValues="ALL_NEW"
         )
+        tenant_management_util.invalidate_tenant(tenantId)
 
         __create_control_plane_event(
             json.dumps({"tenantId": tenantId}), ControlPlaneEventTypes.DEACTIVATE.value)
@@ -175,6 +458,7 @@ def activate_tenant(tenantId):
             },
             ReturnValues="ALL_NEW"
         )
+        tenant_management_util.invalidate_tenant(tenantId)
 
         __create_control_plane_event(json.dumps(
             response['Attributes']), ControlPlaneEventTypes.ACTIVATE.value)
@@ -204,3 +488,6 @@ def __create_control_plane_event(eventDetails, eventType):
 def lambda_handler(event, context):
     logger.debug(event)
     return app.resolve(event, context)
+
+
+lazy_init.record_init_duration('tenant_management')
@@ -3,11 +3,17 @@
 
 import json
 import os
+import time
+from http import HTTPStatus
+import lazy_init
 import utils
+import ndjson
+import pagination
 from aws_lambda_powertools import Tracer
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.logging import correlation_paths
-from aws_lambda_powertools.event_handler import APIGatewayRestResolver
+from aws_lambda_powertools.event_handler import APIGatewayRestResolver, Response, content_types
+from aws_lambda_powertools.event_handler.exceptions import BadRequestError
 import idp_object_factory
 
 tracer = Tracer()
@@ -17,32 +23,191 @@ app = APIGatewayRestResolver()
 idp_name = os.environ['IDP_NAME']
 idp_details=json.loads(os.environ['IDP_DETAILS'])
 
-idp_user_mgmt_service = idp_object_factory.get_idp_user_mgmt_object(idp_name)
+idp_user_mgmt_service = lazy_init.lazy(lambda: idp_object_factory.get_idp_user_mgmt_object(idp_name))
+
+# values accepted by the include query parameter of the user routes
+user_includes = frozenset(['groups'])
+user_batch_required_fields = ['userName', 'email', 'userRole']
+user_batch_max_size = int(os.environ.get('USER_BATCH_MAX_SIZE', 100))
+# Time a batch may spend starting users. It ends well before the 29 second API Gateway
+# integration timeout, since users already started still have to finish.
+user_batch_time_budget_seconds = float(os.environ.get('USER_BATCH_TIME_BUDGET_SECONDS', 20))
+# Time a user listing may spend reading pages before it ends with a next token, even with
+# fewer users than the limit, as filters applied in memory may match few users per page
+user_list_time_budget_seconds = float(os.environ.get('USER_LIST_TIME_BUDGET_SECONDS', 20))
+# the batch route is a static resource next to /users/{username}, which hides a user of that name
+reserved_user_names = frozenset(['batch'])
 
 @app.post("/users")
 @tracer.capture_method
 def create_user():
     user_details = app.current_event.json_body
     logger.info("Request received to create new user")
+    if user_details.get('userName') in reserved_user_names:
+        raise BadRequestError('userName {} is reserved'.format(user_details['userName']))
     user_details['idpDetails'] = idp_details
     response = idp_user_mgmt_service.create_user(user_details)
     logger.info("Request completed to create new user ")
 
     return utils.create_success_response("New user created")
 
+
+@app.post("/users/batch")
+@tracer.capture_method
+def create_users_batch():
+    logger.info("Request received to create a batch of users")
+    body = app.current_event.json_body
+    users = body.get('users') if isinstance(body, dict) else None
+
+    # nothing is created unless every user of the batch is valid
+    errors = __validate_user_batch(users)
+    if errors:
+        return Response(status_code=HTTPStatus.BAD_REQUEST.value,
+                        content_type=content_types.APPLICATION_JSON,
+                        body=json.dumps({'message': 'Invalid user batch', 'errors': errors}))
+
+    # stop starting users in time to return every result, leaving a margin for the users in flight
+    deadline = __deadline(user_batch_time_budget_seconds)
+    results = idp_user_mgmt_service.create_users({'idpDetails': idp_details, 'users': users}, deadline=deadline)
+    failed = sum(1 for result in results if 'error' in result)
+    logger.info({'message': 'User batch processed', 'succeeded': len(results) - failed, 'failed': failed})
+    return utils.generate_response({'results': results, 'succeeded': len(results) - failed, 'failed': failed})
+
+
+def __validate_user_batch(users):
+    if not isinstance(users, list) or not users:
+        return [{'error': 'users must be a non-empty list'}]
+    if len(users) > user_batch_max_size:
+        return [{'error': 'A batch accepts at most {} users'.format(user_batch_max_size)}]
+
+    errors = []
+    user_names = set()
+    for index, user in enumerate(users):
+        if not isinstance(user, dict):
+            errors.append({'index': index, 'error': 'user must be an object'})
+            continue
+        missing = [field for field in user_batch_required_fields
+                   if not isinstance(user.get(field), str) or not user.get(field)]
+        if missing:
+            errors.append({'index': index, 'error': 'missing ' + ', '.join(missing)})
+        elif user['userName'] in reserved_user_names:
+            errors.append({'index': index, 'error': 'userName {} is reserved'.format(user['userName'])})
+        elif user['userName'] in user_names:
+            errors.append({'index': index, 'error': 'duplicate userName ' + user['userName']})
+        else:
+            user_names.add(user['userName'])
+    return errors
+
 @app.get("/users")
 @tracer.capture_method
 def get_users():
-    users = []
     user_details = {}
     user_details['idpDetails'] = idp_details  
     
     logger.info("Request received to get user")
-    response = idp_user_mgmt_service.get_users(user_details)
-        
-    logger.info(response) 
-    num_of_users = len(response)
-    return utils.generate_response(response)
+    stream = ndjson.accepts_ndjson(app.current_event.headers)
+    include = __parse_include()
+    try:
+        user_details['filters'] = __parse_user_filters()
+        limit_value = app.current_event.get_query_string_value('limit')
+        if stream:
+            # NDJSON responses are bounded by their size and time budget, limit only applies when given
+            limit = pagination.parse_limit(limit_value, maximum=ndjson.MAX_RECORDS) if limit_value else None
+        else:
+            limit = pagination.parse_limit(limit_value)
+        # tokens only resume the listing with the filters they were issued for
+        scope = __users_token_scope(user_details['filters'])
+        start = pagination.decode_next_token(app.current_event.get_query_string_value('nextToken'), scope) or {}
+        pages = idp_user_mgmt_service.get_user_pages(user_details, start.get('paginationToken') or None)
+    except (pagination.InvalidPaginationParameter, ValueError) as e:
+        raise BadRequestError(str(e))
+
+    if stream:
+        writer = ndjson.NdjsonWriter(max_records=limit)
+        prepare = None
+        if 'groups' in include:
+            def prepare(users):
+                # only look up the users the response still has room for
+                idp_user_mgmt_service.add_user_groups(
+                    user_details, users if limit is None else users[:limit - writer.count])
+        next_token = __list_users(pages, start, scope, lambda user: writer.add(user.__dict__), writer.is_full,
+                                  prepare, __deadline(user_list_time_budget_seconds))
+        return writer.response(next_token)
+
+    users = []
+
+    def add(user):
+        if len(users) >= limit:
+            return False
+        users.append(user)
+        return True
+
+    next_token = __list_users(pages, start, scope, add, lambda: len(users) >= limit,
+                              deadline=__deadline(user_list_time_budget_seconds))
+    if 'groups' in include:
+        # one concurrent round of lookups for the whole page of the response
+        idp_user_mgmt_service.add_user_groups(user_details, users)
+    logger.info({'message': 'Listed users', 'count': len(users)})
+    return utils.generate_response({'data': users, 'nextToken': next_token})
+
+
+def __parse_user_filters():
+    enabled = app.current_event.get_query_string_value('enabled')
+    if enabled not in (None, 'true', 'false'):
+        raise ValueError('enabled must be true or false')
+    return {
+        'email': app.current_event.get_query_string_value('email'),
+        'status': app.current_event.get_query_string_value('status'),
+        'enabled': None if enabled is None else enabled == 'true',
+    }
+
+
+def __parse_include():
+    value = app.current_event.get_query_string_value('include')
+    include = {item.strip() for item in value.split(',') if item.strip()} if value else set()
+    if include - user_includes:
+        raise BadRequestError('include accepts: ' + ', '.join(sorted(user_includes)))
+    return include
+
+
+def __users_token_scope(filters):
+    active = {name: value for name, value in filters.items() if value is not None}
+    return 'users?' + json.dumps(active, sort_keys=True) if active else 'users'
+
+
+def __list_users(pages, start, scope, add, is_full, prepare=None, deadline=None):
+    # Hands users to add() page by page as Cognito returns them, until add() refuses one,
+    # is_full() or the deadline (a time.monotonic() value) has passed. prepare(), when
+    # given, first gets the users of each page from the resume offset on; a page read past
+    # the deadline is left to the next request rather than prepared. The returned next
+    # token holds the Cognito pagination token of a page and the offset of the first user
+    # of that page not yet added.
+    skip = int(start.get('offset', 0))
+    first_page = True
+    for page_token, users, next_page_token in pages:
+        if prepare:
+            # the first page is always prepared, so every request makes progress
+            if not first_page and deadline is not None and time.monotonic() >= deadline:
+                return __users_next_token(page_token, skip, scope)
+            prepare(users[skip:])
+        first_page = False
+        for offset in range(skip, len(users)):
+            if not add(users[offset]):
+                return __users_next_token(page_token, offset, scope)
+        skip = 0
+        if is_full() or (deadline is not None and time.monotonic() >= deadline):
+            return __users_next_token(next_page_token, 0, scope) if next_page_token else None
+    return None
+
+
+def __deadline(budget_seconds):
+    # the budget ends at the latest 10 seconds before the Lambda times out
+    remaining_seconds = app.lambda_context.get_remaining_time_in_millis() / 1000 - 10
+    return time.monotonic() + max(0, min(budget_seconds, remaining_seconds))
+
+
+def __users_next_token(page_token, offset, scope):
+    return pagination.encode_next_token({'paginationToken': page_token or '', 'offset': offset}, scope)
 
 
 @app.get("/users/<username>")
@@ -53,7 +218,10 @@ def get_user(username):
     user_details['userName'] = username
 
     logger.info("Request received to get user")
+    include = __parse_include()
     user_info = idp_user_mgmt_service.get_user(user_details)
+    if 'groups' in include:
+        idp_user_mgmt_service.add_user_groups(user_details, [user_info])
     logger.info("Request completed to get new user ")
     return utils.create_success_response(user_info.__dict__)
 
@@ -117,3 +285,4 @@ def lambda_handler(event, context):
     return app.resolve(event, context)
 
 
+lazy_init.record_init_duration('user_management')
@@ -8,10 +8,22 @@ class IdpUserManagementAbstractClass (abc.ABC):
     def create_user(self, event):
         pass
     
+    @abc.abstractmethod
+    def create_users(self, event, deadline=None):
+        pass
+    
     @abc.abstractmethod
     def get_users(self, event):
         pass
     
+    @abc.abstractmethod
+    def get_user_pages(self, event, pagination_token=None):
+        pass
+    
+    @abc.abstractmethod
+    def add_user_groups(self, event, users):
+        pass
+    
     @abc.abstractmethod
     def get_user(self, event):
         pass
@@ -0,0 +1,30 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import abc
+from collections import namedtuple
+
+DecodedJwt = namedtuple('DecodedJwt', ['headers', 'claims', 'signing_input', 'signature'])
+
+
+class JwtDecodeError(Exception):
+    """Raised when a token is not a well-formed JWS compact serialization."""
+
+
+class JwtVerifierAbstractClass (abc.ABC):
+
+    @abc.abstractmethod
+    def decode(self, token):
+        """Decodes the token without verifying it and returns a DecodedJwt.
+        Raises JwtDecodeError if the token is malformed."""
+        pass
+
+    @abc.abstractmethod
+    def load_key(self, jwk):
+        """Builds the engine specific public key object from a JWK dict."""
+        pass
+
+    @abc.abstractmethod
+    def verify(self, key, signing_input, signature):
+        """Returns True if signature is a valid RS256 signature of signing_input."""
+        pass
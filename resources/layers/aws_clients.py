@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import threading
+import lazy_init
+
+boto3 = lazy_init.lazy_import('boto3')
+
+# Process-wide boto3 clients and resources, created once per service and reused across
+# invocations so connections (and their TLS sessions) stay in the pool between requests.
+_session = None
+_clients = {}
+_resources = {}
+_tables = {}
+_lock = threading.Lock()
+
+
+def _int_env(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _float_env(name, default):
+    return float(os.environ.get(name, default))
+
+
+def client_config():
+    """botocore Config shared by every client and resource, tunable through the environment."""
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=_int_env('AWS_CLIENT_MAX_POOL_CONNECTIONS', 50),
+        connect_timeout=_float_env('AWS_CLIENT_CONNECT_TIMEOUT_SECONDS', 3),
+        read_timeout=_float_env('AWS_CLIENT_READ_TIMEOUT_SECONDS', 10),
+        tcp_keepalive=os.environ.get('AWS_CLIENT_TCP_KEEPALIVE', 'true').lower() == 'true',
+        retries={
+            'mode': os.environ.get('AWS_CLIENT_RETRY_MODE', 'standard'),
+            'total_max_attempts': _int_env('AWS_CLIENT_MAX_ATTEMPTS', 3),
+        },
+    )
+
+
+def _get_session():
+    # callers hold _lock, boto3 sessions are not safe to build clients from concurrently
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()
+    return _session
+
+
+def get_client(service_name):
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _get_session().client(service_name, config=client_config())
+                _clients[service_name] = client
+    return client
+
+
+def get_resource(service_name):
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = _get_session().resource(service_name, config=client_config())
+                _resources[service_name] = resource
+    return resource
+
+
+def get_table(table_name):
+    table = _tables.get(table_name)
+    if table is None:
+        dynamodb = get_resource('dynamodb')
+        with _lock:
+            table = _tables.get(table_name)
+            if table is None:
+                table = dynamodb.Table(table_name)
+                _tables[table_name] = table
+    return table
+
+
+def reset():
+    """Drops every cached client, resource and table, e.g. after changing the configuration."""
+    global _session
+    with _lock:
+        _session = None
+        _clients.clear()
+        _resources.clear()
+        _tables.clear()
@@ -2,20 +2,37 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from abstract_classes.idp_authorizer_abstract_class import IdpAuthorizerAbstractClass
-import json
-import boto3
+from abstract_classes.jwt_verifier_abstract_class import JwtDecodeError
+import os
 import time
-from jose import jwk, jwt
-from jose.utils import base64url_decode
-import urllib.request
+import idp_object_factory
 from aws_lambda_powertools import Logger
+from cognito.jwks_cache import JwksCache, fetch_cognito_jwks
+import lazy_init
+
+boto3 = lazy_init.lazy_import('boto3')
 
 logger = Logger()
 
-region = boto3.session.Session().region_name
+region = os.environ.get('AWS_REGION') or boto3.session.Session().region_name
+
+# the claim holding the app client id differs between ID and access tokens
+audience_claims = {'id': 'aud', 'access': 'client_id'}
 
 
 class CognitoAuthorizer(IdpAuthorizerAbstractClass):
+    def __init__(self, jwt_verifier=None):
+        # JWT_VERIFIER_ENGINE selects the verification engine: 'cryptography' (default) or 'jose'
+        self.jwt_verifier = jwt_verifier if jwt_verifier is not None else \
+            idp_object_factory.get_jwt_verifier_object(os.environ.get('JWT_VERIFIER_ENGINE', 'cryptography'))
+        # lives as long as the authorizer, i.e. for the life of the execution environment
+        self.jwks_cache = JwksCache(
+            lambda user_pool_id: fetch_cognito_jwks(region, user_pool_id),
+            key_loader=self.jwt_verifier.load_key)
+
+    def get_jwks_cache_stats(self):
+        return self.jwks_cache.stats()
+
     def validateJWT(self, event):
 
         input_details = event
@@ -25,52 +42,49 @@ class CognitoAuthorizer(IdpAuthorizerAbstractClass):
         user_pool_id = idp_details['idp']['userPoolId']
         app_client_id = idp_details['idp']['clientId']
 
-        keys_url = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'.format(
-            region, user_pool_id)
-        with urllib.request.urlopen(keys_url) as f:  # nosec B310 # keys_url defined above with https://
-            response = f.read()
-        keys = json.loads(response.decode('utf-8'))['keys']
-
-        response = self.__validateCognitoJWT(token, app_client_id, keys)
+        response = self.__validateCognitoJWT(token, app_client_id, user_pool_id)
 
         return response
 
-    def __validateCognitoJWT(self, token, app_client_id, keys):
-        # get the kid from the headers prior to verification
-        headers = jwt.get_unverified_headers(token)
-        kid = headers['kid']
-        # search for the kid in the downloaded public keys
-        key_index = -1
-        for i in range(len(keys)):
-            if kid == keys[i]['kid']:
-                key_index = i
-                break
-        if key_index == -1:
-            logger.info('Public key not found in jwks.json')
+    def __validateCognitoJWT(self, token, app_client_id, user_pool_id):
+        # run every cheap header and claim check before any crypto, so that
+        # expired or misdirected tokens never pay for the signature verification
+        try:
+            decoded = self.jwt_verifier.decode(token)
+        except JwtDecodeError:
+            logger.info('Token is malformed')
             return False
-        # construct the public key
-        public_key = jwk.construct(keys[key_index])
-        # get the last two sections of the token,
-        # message and signature (encoded in base64)
-        message, encoded_signature = str(token).rsplit('.', 1)
-        # decode the signature
-        decoded_signature = base64url_decode(encoded_signature.encode('utf-8'))
-        # verify the signature
-        if not public_key.verify(message.encode("utf8"), decoded_signature):
-            logger.info('Signature verification failed')
+        headers = decoded.headers
+        claims = decoded.claims
+        kid = headers.get('kid')
+        if not isinstance(kid, str) or headers.get('alg') != 'RS256':
+            logger.info('Token header is not a Cognito RS256 header')
             return False
-        logger.info('Signature successfully verified')
-        # since we passed the verification, we can now safely
-        # use the unverified claims
-        claims = jwt.get_unverified_claims(token)
-        # additionally we can verify the token expiration
-        if time.time() > claims['exp']:
+        # verify the token expiration
+        if not isinstance(claims.get('exp'), (int, float)) or time.time() > claims['exp']:
             logger.info('Token is expired')
             return False
-        # and the Audience  (use claims['client_id'] if verifying an access token)
-        if claims['aud'] != app_client_id:
+        # and the Audience (claims['client_id'] for access tokens)
+        audience_claim = audience_claims.get(claims.get('token_use'))
+        if audience_claim is None:
+            logger.info('Token has an unknown token_use')
+            return False
+        if claims.get(audience_claim) != app_client_id:
             logger.info('Token was not issued for this audience')
             return False
+        if claims.get('iss') != 'https://cognito-idp.{}.amazonaws.com/{}'.format(region, user_pool_id):
+            logger.info('Token was not issued by this user pool')
+            return False
+        # look up the prebuilt public key for the kid
+        public_key = self.jwks_cache.get_key(user_pool_id, kid)
+        if public_key is None:
+            logger.info('Public key not found in jwks.json')
+            return False
+        # verify the signature
+        if not self.jwt_verifier.verify(public_key, decoded.signing_input, decoded.signature):
+            logger.info('Signature verification failed')
+            return False
+        logger.info('Signature successfully verified')
         # now we can use the claims
         logger.info(claims)
         return claims
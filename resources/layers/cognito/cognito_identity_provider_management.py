@@ -1,15 +1,16 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-import boto3
 import os
 import uuid
 import cognito.user_management_util as user_management_util
 from aws_lambda_powertools import Logger
 from abstract_classes.identity_provider_abstract_class import IdentityProviderAbstractClass
+import lazy_init
+import aws_clients
 
 logger = Logger()
-cognito = boto3.client('cognito-idp')
+cognito = lazy_init.lazy(lambda: aws_clients.get_client('cognito-idp'))
 
 
 class CognitoIdentityProviderManagement(IdentityProviderAbstractClass):
@@ -1,12 +1,29 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-import boto3
+from concurrent.futures import ThreadPoolExecutor
 import cognito.user_management_util as user_management_util
 from abstract_classes.idp_user_management_abstract_class import IdpUserManagementAbstractClass
+import lazy_init
+import aws_clients
+import os
+import time
+import throttling
 
+client = lazy_init.lazy(lambda: aws_clients.get_client('cognito-idp'))
 
-client = boto3.client('cognito-idp')
+# list_users returns at most 60 users per call
+LIST_USERS_MAX_LIMIT = 60
+# the user attributes UserInfo is built from, Username, Enabled, UserStatus and the dates
+# are always returned
+USER_INFO_ATTRIBUTES = ['email', 'custom:userRole']
+USER_STATUSES = frozenset([
+    'UNCONFIRMED', 'CONFIRMED', 'ARCHIVED', 'COMPROMISED', 'UNKNOWN', 'RESET_REQUIRED',
+    'FORCE_CHANGE_PASSWORD', 'EXTERNAL_PROVIDER'])
+USER_BATCH_MAX_WORKERS = int(os.environ.get('USER_BATCH_MAX_WORKERS', 10))
+# enough for a default page of users in one round of lookups, and no more than the
+# connections of the client pool (AWS_CLIENT_MAX_POOL_CONNECTIONS)
+USER_GROUPS_MAX_WORKERS = int(os.environ.get('USER_GROUPS_MAX_WORKERS', 50))
 
 class CognitoUserManagementService(IdpUserManagementAbstractClass):
     def create_user(self, event):
@@ -14,42 +31,92 @@ class CognitoUserManagementService(IdpUserManagementAbstractClass):
         user_pool_id = user_details['idpDetails']['idp']['userPoolId']
         user_group_name = user_details['userRole']
 
-        response = user_management_util.create_user(user_pool_id, user_details)
-        user_group_exists = user_management_util.user_group_exists(user_pool_id, user_group_name)
-        if not user_group_exists:
-            user_management_util.create_user_group(user_pool_id, user_group_name)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # the group does not depend on the user, it is looked up or created meanwhile
+            group_ready = executor.submit(user_management_util.ensure_user_group, user_pool_id, user_group_name)
+            response = user_management_util.create_user(user_pool_id, user_details)
+            group_ready.result()
 
         user_management_util.add_user_to_group(user_pool_id, user_details['userName'], user_group_name)
         return response
 
+    def create_users(self, event, deadline=None):
+        """Creates every user of event['users'] and adds it to the group of its userRole.
+        The groups are created once up front, then the users are created on a pool of
+        USER_BATCH_MAX_WORKERS threads, retrying throttled calls with backoff. Returns one
+        {'index', 'userName'} result per user, with an 'error' if that user failed.
+
+        Users not started by deadline (a time.monotonic() value) are skipped with the
+        error 'not attempted', so the caller can answer before its own timeout."""
+        user_pool_id = event['idpDetails']['idp']['userPoolId']
+        users = event['users']
+
+        group_errors = {}
+        for group_name in dict.fromkeys(user['userRole'] for user in users):
+            try:
+                throttling.call_with_backoff(
+                    lambda: user_management_util.ensure_user_group(user_pool_id, group_name))
+            except Exception as e:
+                group_errors[group_name] = str(e)
+
+        def create(index, user_details):
+            result = {'index': index, 'userName': user_details['userName']}
+            if user_details['userRole'] in group_errors:
+                result['error'] = 'Group {} could not be created: {}'.format(
+                    user_details['userRole'], group_errors[user_details['userRole']])
+                return result
+            if deadline is not None and time.monotonic() >= deadline:
+                result['error'] = 'not attempted'
+                return result
+            try:
+                # each step is retried on its own, a throttled add does not create the user twice
+                throttling.call_with_backoff(
+                    lambda: user_management_util.create_user(user_pool_id, user_details))
+                throttling.call_with_backoff(
+                    lambda: user_management_util.add_user_to_group(
+                        user_pool_id, user_details['userName'], user_details['userRole']))
+            except Exception as e:
+                result['error'] = str(e)
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, min(USER_BATCH_MAX_WORKERS, len(users)))) as executor:
+            return list(executor.map(create, range(len(users)), users))
+
     def get_users(self, event):
-        user_details = event
-        user_pool_id = user_details['idpDetails']['idp']['userPoolId']
-        users = []
-    
-        response = client.list_users(
-                UserPoolId=user_pool_id
-            )
-          
-        num_of_users = len(response['Users'])
-    
-        if (num_of_users > 0):
-                for user in response['Users']:
-                    user_info = UserInfo()
-                    for attr in user["Attributes"]:
-                        if(attr["Name"] == "custom:userRole"):
-                            user_info.user_role = attr["Value"]
-    
-                        if(attr["Name"] == "email"):
-                            user_info.email = attr["Value"] 
-                    user_info.enabled = user["Enabled"]
-                    user_info.created = user["UserCreateDate"]
-                    user_info.modified = user["UserLastModifiedDate"]
-                    user_info.status = user["UserStatus"] 
-                    user_info.user_name = user["Username"]
-                    users.append(user_info)                    
-            
+        return [user for _, users, _ in self.get_user_pages(event) for user in users]
+
+    def get_user_pages(self, event, pagination_token=None):
+        """Returns an iterator of (pagination token of the page, list of UserInfo, pagination
+        token of the next page or None) for every page of users, starting at
+        pagination_token, so callers can process the pool one page at a time. Only users
+        matching the filters of the event (see build_user_filter) are returned; invalid
+        filters raise ValueError right away rather than once the pages are read."""
+        cognito_filter, matches = build_user_filter(event.get('filters'))
+        return _user_pages(event['idpDetails']['idp']['userPoolId'], cognito_filter, matches, pagination_token)
+
+    def add_user_groups(self, event, users):
+        """Sets the groups attribute of every UserInfo in users to the names of the Cognito
+        groups the user belongs to. The lookups run concurrently on up to
+        USER_GROUPS_MAX_WORKERS threads, users looked up recently come from the membership
+        cache. Returns users."""
+        user_pool_id = event['idpDetails']['idp']['userPoolId']
+        if not users:
+            return users
+
+        def list_groups(user_info):
+            return throttling.call_with_backoff(
+                lambda: user_management_util.list_groups_for_user(user_pool_id, user_info.user_name))
+
+        with ThreadPoolExecutor(max_workers=min(USER_GROUPS_MAX_WORKERS, len(users))) as executor:
+            for user_info, groups in zip(users, executor.map(list_groups, users)):
+                user_info.groups = groups
         return users
+
+    def export_users(self, event, output, **kwargs):
+        """Exports every user of the pool to output as NDJSON, paging disjoint shards of the
+        pool concurrently. See cognito.user_export.UserExport for the options."""
+        from cognito.user_export import export_users
+        return export_users(output, event['idpDetails']['idp']['userPoolId'], **kwargs)
     
 
     def get_user(self, event):
@@ -133,6 +200,78 @@ class CognitoUserManagementService(IdpUserManagementAbstractClass):
 
 
 
+def _user_pages(user_pool_id, cognito_filter, matches, pagination_token):
+    while True:
+        list_users_kwargs = {
+            'UserPoolId': user_pool_id,
+            'Limit': LIST_USERS_MAX_LIMIT,
+            'AttributesToGet': USER_INFO_ATTRIBUTES,
+        }
+        if cognito_filter:
+            list_users_kwargs['Filter'] = cognito_filter
+        if pagination_token:
+            list_users_kwargs['PaginationToken'] = pagination_token
+        response = client.list_users(**list_users_kwargs)
+        next_pagination_token = response.get('PaginationToken')
+        users = [to_user_info(user) for user in response['Users']]
+        yield pagination_token, [user for user in users if matches(user)], next_pagination_token
+
+        if not next_pagination_token:
+            return
+        pagination_token = next_pagination_token
+
+
+def build_user_filter(filters):
+    """Returns the list_users Filter expression for filters and a predicate over UserInfo.
+    filters may hold an email prefix, a user status and enabled (a bool). Cognito accepts a
+    single filter, the most selective one is applied by Cognito and the others by the
+    predicate. Raises ValueError for invalid filter values."""
+    filters = {name: value for name, value in (filters or {}).items() if value is not None}
+    clauses = []
+    predicates = []
+    if 'email' in filters:
+        email = filters['email']
+        if not isinstance(email, str) or not email or '"' in email or '\\' in email:
+            raise ValueError('email must be a non-empty prefix without quotes or backslashes')
+        clauses.append('email ^= "{}"'.format(email))
+        predicates.append(lambda user: (user.email or '').startswith(email))
+    if 'status' in filters:
+        status = filters['status']
+        if status not in USER_STATUSES:
+            raise ValueError('status must be one of {}'.format(', '.join(sorted(USER_STATUSES))))
+        clauses.append('cognito:user_status = "{}"'.format(status))
+        predicates.append(lambda user: user.status == status)
+    if 'enabled' in filters:
+        enabled = filters['enabled']
+        if not isinstance(enabled, bool):
+            raise ValueError('enabled must be true or false')
+        # the status attribute of a Cognito filter is the Enabled flag of a user
+        clauses.append('status = "{}"'.format('Enabled' if enabled else 'Disabled'))
+        predicates.append(lambda user: user.enabled == enabled)
+
+    if not clauses:
+        return None, lambda user: True
+    remaining = predicates[1:]
+    return clauses[0], lambda user: all(predicate(user) for predicate in remaining)
+
+
+def to_user_info(user):
+    """Builds the UserInfo of a user returned by the Cognito list_users API."""
+    user_info = UserInfo()
+    for attr in user.get("Attributes", []):
+        if(attr["Name"] == "custom:userRole"):
+            user_info.user_role = attr["Value"]
+
+        if(attr["Name"] == "email"):
+            user_info.email = attr["Value"]
+    user_info.enabled = user["Enabled"]
+    user_info.created = user["UserCreateDate"]
+    user_info.modified = user["UserLastModifiedDate"]
+    user_info.status = user["UserStatus"]
+    user_info.user_name = user["Username"]
+    return user_info
+
+
 class UserInfo:
     def __init__(self, user_name=None, user_role=None, 
     email=None, status=None, enabled=None, created=None, modified=None):
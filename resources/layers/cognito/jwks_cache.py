@@ -0,0 +1,136 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from aws_lambda_powertools import Logger
+
+logger = Logger()
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MIN_REFRESH_INTERVAL_SECONDS = 30
+
+
+def fetch_cognito_jwks(region, user_pool_id):
+    keys_url = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'.format(
+        region, user_pool_id)
+    with urllib.request.urlopen(keys_url, timeout=5) as f:  # nosec B310 # keys_url defined above with https://
+        response = f.read()
+    return json.loads(response.decode('utf-8'))['keys']
+
+
+class JwksCache:
+    """Process-wide cache of the JWKS documents of one or more user pools.
+
+    Entries live for ttl_seconds. A kid that is not in a (fresh) entry forces
+    one refresh, at most once every min_refresh_interval_seconds per pool, so
+    tokens carrying bogus kids cannot trigger a refresh storm. If a refresh
+    fails and keys were previously loaded, the stale keys keep being served.
+
+    Every load builds an index of kid -> key_loader(jwk), so the (expensive)
+    public key construction happens once per JWKS load instead of per call."""
+
+    def __init__(self, fetcher, key_loader=None, ttl_seconds=None, min_refresh_interval_seconds=None):
+        self.fetcher = fetcher
+        self.key_loader = key_loader if key_loader is not None else (lambda key: key)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(
+            os.environ.get('JWKS_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+        self.min_refresh_interval_seconds = min_refresh_interval_seconds \
+            if min_refresh_interval_seconds is not None else int(
+                os.environ.get('JWKS_REFRESH_MIN_INTERVAL_SECONDS', DEFAULT_MIN_REFRESH_INTERVAL_SECONDS))
+        self._entries = {}
+        self._lock = threading.Lock()
+        # _lock is held across the JWKS fetch, the counters have their own lock so that
+        # lookups served from the cache never wait for a refresh
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'kidMissRefreshes': 0,
+            'refreshFailures': 0,
+            'staleServed': 0,
+        }
+
+    def get_key(self, user_pool_id, kid):
+        """Returns the loaded key of the user pool for kid, or None. If kid is
+        not present in the cached keys, one rate-limited refresh is attempted."""
+        entry = self._entries.get(user_pool_id)
+        now = time.monotonic()
+
+        if entry is None:
+            self._count('misses')
+            entry = self._refresh(user_pool_id, now)
+        elif now - entry['fetchedAt'] >= self.ttl_seconds:
+            self._count('misses')
+            if now - entry['lastRefreshAttempt'] >= self.min_refresh_interval_seconds:
+                entry = self._refresh(user_pool_id, now)
+            else:
+                # a refresh failed recently, keep serving the stale keys until we may retry
+                self._count('staleServed')
+        else:
+            self._count('hits')
+
+        if kid not in entry['index'] \
+                and now - entry['lastRefreshAttempt'] >= self.min_refresh_interval_seconds:
+            logger.info('kid not found in cached jwks.json, refreshing')
+            self._count('kidMissRefreshes')
+            entry = self._refresh(user_pool_id, now)
+
+        return entry['index'].get(kid)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hitRate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['pools'] = len(self._entries)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _refresh(self, user_pool_id, now):
+        with self._lock:
+            entry = self._entries.get(user_pool_id)
+            # another thread may have refreshed while we waited for the lock
+            if entry is not None and entry['lastRefreshAttempt'] >= now:
+                return entry
+            try:
+                keys = self.fetcher(user_pool_id)
+            except Exception as e:
+                self._count('refreshFailures')
+                if entry is None:
+                    raise
+                logger.warning('Unable to refresh jwks.json, serving stale keys: %s', e)
+                self._count('staleServed')
+                entry['lastRefreshAttempt'] = time.monotonic()
+                return entry
+
+            self._count('refreshes')
+            refreshed_at = time.monotonic()
+            entry = {
+                'index': self._build_index(keys),
+                'fetchedAt': refreshed_at,
+                'lastRefreshAttempt': refreshed_at,
+            }
+            self._entries[user_pool_id] = entry
+            logger.info({'jwksCacheStats': self.stats()})
+            return entry
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _build_index(self, keys):
+        index = {}
+        for key in keys:
+            try:
+                index[key['kid']] = self.key_loader(key)
+            except Exception as e:
+                logger.warning('Skipping unusable key %s in jwks.json: %s', key.get('kid'), e)
+        return index
@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+import itertools
+import os
+
+import simplejson
+import aws_clients
+import throttling
+import cognito.cognito_user_management_service as cognito_user_management_service
+from ndjson_export import CheckpointedExport
+
+DEFAULT_SHARD_PREFIX_LENGTH = int(os.environ.get('USER_EXPORT_SHARD_PREFIX_LENGTH', 1))
+DEFAULT_MAX_WORKERS = int(os.environ.get('USER_EXPORT_MAX_WORKERS', 4))
+# ListUsers shares a per account request rate quota with the other user listing APIs,
+# the export keeps below it so the user management service is not throttled meanwhile
+DEFAULT_RATE_PER_SECOND = float(os.environ.get('USER_EXPORT_RATE_PER_SECOND', 20))
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get('USER_EXPORT_PROGRESS_INTERVAL_SECONDS', 10))
+_HEX_DIGITS = '0123456789abcdef'
+
+
+class UserExport(CheckpointedExport):
+    """Exports every user of a Cognito user pool as NDJSON. list_users only pages
+    sequentially, so the pool is split into shards with a prefix filter on sub, a lowercase
+    UUID: the 16 ** shard_prefix_length hex prefixes are disjoint and together cover every
+    user. The shards are paged on a pool of max_workers threads that share a rate limit of
+    rate_per_second list_users calls.
+
+    The checkpoint records the pagination token of every shard, see CheckpointedExport for
+    resuming and the output handling. Cognito pagination tokens expire, resume an
+    interrupted export promptly."""
+
+    label = 'User export'
+    record_name = 'users'
+    part_name = 'shards'
+
+    def __init__(self, output, user_pool_id, shard_prefix_length=None, max_workers=None,
+                 rate_per_second=None, checkpoint_path=None, progress_callback=None):
+        self.user_pool_id = user_pool_id
+        self.shard_prefix_length = shard_prefix_length or DEFAULT_SHARD_PREFIX_LENGTH
+        self.rate_limiter = throttling.RateLimiter(rate_per_second or DEFAULT_RATE_PER_SECOND)
+        shards = [''.join(prefix) for prefix in itertools.product(_HEX_DIGITS, repeat=self.shard_prefix_length)]
+        super().__init__(output, shards, max_workers or DEFAULT_MAX_WORKERS,
+                         checkpoint_path=checkpoint_path, progress_callback=progress_callback,
+                         progress_interval_seconds=PROGRESS_INTERVAL_SECONDS)
+
+    def checkpoint_identity(self):
+        return {'userPoolId': self.user_pool_id, 'shardPrefixLength': self.shard_prefix_length}
+
+    def _export_part(self, shard, pagination_token):
+        client = aws_clients.get_client('cognito-idp')
+        list_users_kwargs = {
+            'UserPoolId': self.user_pool_id,
+            'Limit': cognito_user_management_service.LIST_USERS_MAX_LIMIT,
+            'AttributesToGet': cognito_user_management_service.USER_INFO_ATTRIBUTES,
+            'Filter': 'sub ^= "{}"'.format(shard),
+        }
+
+        while True:
+            if pagination_token:
+                list_users_kwargs['PaginationToken'] = pagination_token
+
+            def list_users():
+                self.rate_limiter.acquire()
+                return client.list_users(**list_users_kwargs)
+
+            response = throttling.call_with_backoff(list_users)
+            lines = ''.join(
+                simplejson.dumps(cognito_user_management_service.to_user_info(user).__dict__,
+                                 default=_serialize, sort_keys=True) + '\n'
+                for user in response['Users'])
+            pagination_token = response.get('PaginationToken')
+            self._write_page(shard, lines, len(response['Users']), pagination_token)
+            if not pagination_token:
+                return
+
+
+def _serialize(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+def export_users(output, user_pool_id, **kwargs):
+    """Exports the users of user_pool_id to output (a file path or a writable text stream)
+    as NDJSON, see UserExport for the options. Returns the throughput statistics."""
+    return UserExport(output, user_pool_id, **kwargs).run()
@@ -1,9 +1,26 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-import boto3
+import os
+import threading
+import lazy_init
+import aws_clients
+from ttl_cache import TTLCache
 
-cognito = boto3.client('cognito-idp')
+cognito = lazy_init.lazy(lambda: aws_clients.get_client('cognito-idp'))
+
+# Group names of each user pool, loaded once with list_groups and updated with the groups
+# created here. Groups created elsewhere are picked up when the entry expires; until then
+# creating them again is harmless, see ensure_user_group.
+user_group_cache = TTLCache(
+    max_size=int(os.environ.get('USER_GROUP_CACHE_MAX_SIZE', 64)),
+    ttl_seconds=float(os.environ.get('USER_GROUP_CACHE_TTL_SECONDS', 300)))
+_user_group_cache_lock = threading.Lock()
+# Group memberships by (user pool, user name). Memberships also change outside this
+# module, so entries only live for a short while.
+user_membership_cache = TTLCache(
+    max_size=int(os.environ.get('USER_MEMBERSHIP_CACHE_MAX_SIZE', 1024)),
+    ttl_seconds=float(os.environ.get('USER_MEMBERSHIP_CACHE_TTL_SECONDS', 30)))
 
 
 def create_user_group(user_pool_id, group_name):
@@ -43,6 +60,7 @@ def add_user_to_group(user_pool_id, user_name, group_name):
             Username=user_name,
             GroupName=group_name
         )
+        user_membership_cache.invalidate((user_pool_id, user_name))
         return response
 
 def user_group_exists(user_pool_id, group_name):        
@@ -52,5 +70,68 @@ def user_group_exists(user_pool_id, group_name):
                    GroupName=group_name)
             return True
         except Exception as e:
-            return False
-        
\ No newline at end of file
+            # only a missing group means False, throttling or access errors are not answers
+            if _error_code(e) == 'ResourceNotFoundException':
+                return False
+            raise
+
+
+def get_user_groups(user_pool_id):
+    """Returns the set of group names of the pool, from the group cache when possible."""
+    groups = user_group_cache.get(user_pool_id)
+    if groups is None:
+        with _user_group_cache_lock:
+            groups = user_group_cache.get(user_pool_id)
+            if groups is None:
+                groups = set()
+                list_groups_kwargs = {'UserPoolId': user_pool_id, 'Limit': 60}
+                while True:
+                    response = cognito.list_groups(**list_groups_kwargs)
+                    groups.update(group['GroupName'] for group in response['Groups'])
+                    if not response.get('NextToken'):
+                        break
+                    list_groups_kwargs['NextToken'] = response['NextToken']
+                user_group_cache.put(user_pool_id, groups)
+    return groups
+
+
+def list_groups_for_user(user_pool_id, user_name):
+    """Returns the names of the groups the user belongs to, from the membership cache when
+    possible."""
+    key = (user_pool_id, user_name)
+    groups = user_membership_cache.get(key)
+    if groups is None:
+        groups = []
+        list_groups_kwargs = {'UserPoolId': user_pool_id, 'Username': user_name, 'Limit': 60}
+        while True:
+            response = cognito.admin_list_groups_for_user(**list_groups_kwargs)
+            groups.extend(group['GroupName'] for group in response['Groups'])
+            if not response.get('NextToken'):
+                break
+            list_groups_kwargs['NextToken'] = response['NextToken']
+        user_membership_cache.put(key, groups)
+    # callers may modify the list, never hand out the cached instance
+    return list(groups)
+
+
+def ensure_user_group(user_pool_id, group_name):
+    """Creates the group unless the pool already has it. A group created concurrently by
+    someone else (GroupExistsException) counts as existing. Returns True if it was created
+    by this call."""
+    groups = get_user_groups(user_pool_id)
+    if group_name in groups:
+        return False
+    try:
+        create_user_group(user_pool_id, group_name)
+        created = True
+    except Exception as e:
+        if _error_code(e) != 'GroupExistsException':
+            raise
+        created = False
+    with _user_group_cache_lock:
+        groups.add(group_name)
+    return created
+
+
+def _error_code(error):
+    return (getattr(error, 'response', None) or {}).get('Error', {}).get('Code')
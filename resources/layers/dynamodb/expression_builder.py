@@ -0,0 +1,192 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import functools
+import re
+from decimal import Decimal
+
+# attribute names, optionally nested with dots, e.g. tenantConfig.hostname
+_ATTRIBUTE_PATH = re.compile(r'^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*$')
+MAX_PROJECTED_FIELDS = 50
+
+
+class InvalidExpressionParameter(ValueError):
+    pass
+
+
+def parse_fields(value, default=None, required=()):
+    """Parses a comma separated fields query parameter into a list of attribute paths.
+    '*' selects whole items and returns None, as does a missing value without a default.
+    The attributes in required are always part of a projection."""
+    if value is None or value == '':
+        fields = list(default) if default else None
+    elif value.strip() == '*':
+        fields = None
+    else:
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        invalid = [field for field in fields if not _ATTRIBUTE_PATH.match(field)]
+        if invalid or not fields:
+            raise InvalidExpressionParameter('fields contains invalid attribute names: {}'.format(', '.join(invalid)))
+    if fields is None:
+        return None
+
+    fields = list(required) + [field for field in fields if field not in required]
+    fields = list(dict.fromkeys(fields))
+    # DynamoDB rejects overlapping paths, a selected attribute already covers its nested ones
+    fields = [field for field in fields
+              if not any(field.startswith(other + '.') for other in fields)]
+    if len(fields) > MAX_PROJECTED_FIELDS:
+        raise InvalidExpressionParameter('fields accepts at most {} attributes'.format(MAX_PROJECTED_FIELDS))
+    return fields
+
+
+def build_projection(fields):
+    """Returns the ProjectionExpression and ExpressionAttributeNames request parameters for
+    the attribute paths in fields, or an empty dict to read whole items. Every path element
+    goes through a #name placeholder, so reserved words such as name or status are safe."""
+    if not fields:
+        return {}
+
+    attribute_names = {}
+    placeholders = {}
+    paths = []
+    for field in fields:
+        path = []
+        for element in field.split('.'):
+            placeholder = placeholders.get(element)
+            if placeholder is None:
+                placeholder = '#p{}'.format(len(placeholders))
+                placeholders[element] = placeholder
+                attribute_names[placeholder] = element
+            path.append(placeholder)
+        paths.append('.'.join(path))
+
+    return {
+        'ProjectionExpression': ', '.join(paths),
+        'ExpressionAttributeNames': attribute_names,
+    }
+
+
+def build_equality_filter(conditions):
+    """Returns the FilterExpression, ExpressionAttributeNames and ExpressionAttributeValues
+    request parameters matching items whose attributes equal every value in conditions.
+    Placeholders are prefixed with f, so they can be combined with build_projection."""
+    if not isinstance(conditions, dict) or not conditions:
+        raise InvalidExpressionParameter('filter must be a non-empty object')
+
+    attribute_names = {}
+    attribute_values = {}
+    clauses = []
+    for index, (field, value) in enumerate(conditions.items()):
+        if not isinstance(field, str) or not _ATTRIBUTE_PATH.match(field):
+            raise InvalidExpressionParameter('filter contains an invalid attribute name: {}'.format(field))
+        if isinstance(value, (dict, list)) or value is None:
+            raise InvalidExpressionParameter('filter values must be strings, numbers or booleans')
+        path = []
+        for depth, element in enumerate(field.split('.')):
+            placeholder = '#f{}_{}'.format(index, depth)
+            attribute_names[placeholder] = element
+            path.append(placeholder)
+        # DynamoDB numbers are Decimals, floats from a JSON body are rejected by boto3
+        attribute_values[':f{}'.format(index)] = Decimal(str(value)) if isinstance(value, float) else value
+        clauses.append('{} = :f{}'.format('.'.join(path), index))
+
+    return {
+        'FilterExpression': ' AND '.join(clauses),
+        'ExpressionAttributeNames': attribute_names,
+        'ExpressionAttributeValues': attribute_values,
+    }
+
+
+_MISSING = object()
+
+
+def build_update(changes, remove=(), base=None, return_values='NONE'):
+    """Returns the UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues and
+    ReturnValues update_item parameters that SET every attribute path in changes and REMOVE
+    the paths in remove. A path is an attribute name, a dotted path such as
+    tenantConfig.hostname, or a tuple of path elements for names that contain dots or spaces.
+
+    With a base (the current item), attributes whose value equals the one in base are left
+    out, and paths in remove that base does not hold are dropped. Returns None when nothing
+    is left to write."""
+    set_paths = [(_path_elements(path), value) for path, value in changes.items()]
+    remove_paths = [_path_elements(path) for path in remove]
+
+    if base is not None:
+        set_paths = [(path, value) for path, value in set_paths if _lookup(base, path) != value]
+        remove_paths = [path for path in remove_paths if _lookup(base, path) is not _MISSING]
+    if not set_paths and not remove_paths:
+        return None
+
+    update_expression, attribute_names = _update_template(
+        tuple(path for path, _ in set_paths), tuple(remove_paths))
+    update = {
+        'UpdateExpression': update_expression,
+        'ExpressionAttributeNames': dict(attribute_names),
+        'ReturnValues': return_values,
+    }
+    if set_paths:
+        update['ExpressionAttributeValues'] = {
+            ':u{}'.format(index): value for index, (_, value) in enumerate(set_paths)}
+    return update
+
+
+@functools.lru_cache(maxsize=256)
+def _update_template(set_paths, remove_paths):
+    # Updates of the same shape share the expression, only the values differ per call.
+    placeholders = {}
+    attribute_names = []
+
+    def placeholder_path(path):
+        elements = []
+        for element in path:
+            if element not in placeholders:
+                placeholders[element] = '#u{}'.format(len(placeholders))
+                attribute_names.append((placeholders[element], element))
+            elements.append(placeholders[element])
+        return '.'.join(elements)
+
+    clauses = []
+    if set_paths:
+        clauses.append('SET ' + ', '.join(
+            '{} = :u{}'.format(placeholder_path(path), index) for index, path in enumerate(set_paths)))
+    if remove_paths:
+        clauses.append('REMOVE ' + ', '.join(placeholder_path(path) for path in remove_paths))
+    return ' '.join(clauses), tuple(attribute_names)
+
+
+def _path_elements(path):
+    if isinstance(path, tuple):
+        if path and all(isinstance(element, str) and element for element in path):
+            return path
+    elif isinstance(path, str) and _ATTRIBUTE_PATH.match(path):
+        return tuple(path.split('.'))
+    raise InvalidExpressionParameter('Invalid attribute name: {}'.format(path))
+
+
+def _lookup(item, path):
+    value = item
+    for element in path:
+        if not isinstance(value, dict) or element not in value:
+            return _MISSING
+        value = value[element]
+    return value
+
+
+def project_item(item, fields):
+    """Applies a projection built from fields to an item already in memory, the way
+    DynamoDB applies the ProjectionExpression of build_projection."""
+    if not fields:
+        return item
+    projected = {}
+    for field in fields:
+        path = field.split('.')
+        value = _lookup(item, path)
+        if value is _MISSING:
+            continue
+        target = projected
+        for element in path[:-1]:
+            target = target.setdefault(element, {})
+        target[path[-1]] = value
+    return projected
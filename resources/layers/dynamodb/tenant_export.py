@@ -0,0 +1,74 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+
+import simplejson
+import aws_clients
+from ndjson_export import CheckpointedExport
+
+DEFAULT_TOTAL_SEGMENTS = int(os.environ.get('TENANT_EXPORT_TOTAL_SEGMENTS', 8))
+DEFAULT_MAX_WORKERS = int(os.environ.get('TENANT_EXPORT_MAX_WORKERS', 8))
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get('TENANT_EXPORT_PROGRESS_INTERVAL_SECONDS', 10))
+
+
+class TenantExport(CheckpointedExport):
+    """Exports every item of the tenant details table as NDJSON with a DynamoDB parallel
+    scan. Each of the total_segments segments is scanned page by page on a pool of
+    max_workers threads. The checkpoint records the last evaluated key of every segment,
+    see CheckpointedExport for resuming and the output handling."""
+
+    label = 'Tenant export'
+    record_name = 'items'
+    part_name = 'segments'
+
+    def __init__(self, output, table_name=None, total_segments=None, max_workers=None,
+                 checkpoint_path=None, page_size=None, progress_callback=None):
+        self.table_name = table_name or os.environ['TENANT_DETAILS_TABLE']
+        self.total_segments = total_segments or DEFAULT_TOTAL_SEGMENTS
+        self.page_size = page_size
+        super().__init__(output, range(self.total_segments), max_workers or DEFAULT_MAX_WORKERS,
+                         checkpoint_path=checkpoint_path, progress_callback=progress_callback,
+                         progress_interval_seconds=PROGRESS_INTERVAL_SECONDS, counters=['consumedCapacity'])
+
+    def run(self):
+        from boto3.dynamodb.types import TypeDeserializer
+
+        self._deserializer = TypeDeserializer()
+        return super().run()
+
+    def checkpoint_identity(self):
+        return {'tableName': self.table_name, 'totalSegments': self.total_segments}
+
+    def _export_part(self, segment, start_key):
+        dynamodb = aws_clients.get_client('dynamodb')
+        scan_kwargs = {
+            'TableName': self.table_name,
+            'Segment': int(segment),
+            'TotalSegments': self.total_segments,
+            'ReturnConsumedCapacity': 'TOTAL',
+        }
+        if self.page_size:
+            scan_kwargs['Limit'] = self.page_size
+
+        while True:
+            if start_key:
+                scan_kwargs['ExclusiveStartKey'] = start_key
+            response = dynamodb.scan(**scan_kwargs)
+            lines = ''.join(
+                simplejson.dumps(self._deserialize(item), use_decimal=True, sort_keys=True) + '\n'
+                for item in response.get('Items', []))
+            start_key = response.get('LastEvaluatedKey')
+            self._write_page(segment, lines, len(response.get('Items', [])), start_key,
+                             consumedCapacity=response.get('ConsumedCapacity', {}).get('CapacityUnits', 0.0))
+            if not start_key:
+                return
+
+    def _deserialize(self, item):
+        return {name: self._deserializer.deserialize(value) for name, value in item.items()}
+
+
+def export_tenants(output, **kwargs):
+    """Exports the tenant details table to output (a file path or a writable text stream)
+    as NDJSON, see TenantExport for the options. Returns the throughput statistics."""
+    return TenantExport(output, **kwargs).run()
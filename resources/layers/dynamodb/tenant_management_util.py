@@ -2,28 +2,110 @@
 # SPDX-License-Identifier: Apache-2.0
 
 # import json
+import copy
 import os
+import re
+import threading
 import uuid
+from datetime import datetime
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
+import lazy_init
+import aws_clients
+import throttling
+from ttl_cache import TTLCache
+import dynamodb.expression_builder as expression_builder
 
 tracer = Tracer()
 logger = Logger()
 
-dynamodb = boto3.resource('dynamodb')
-tenant_details_table = dynamodb.Table(os.environ['TENANT_DETAILS_TABLE'])
+tenant_details_table = lazy_init.lazy(lambda: aws_clients.get_table(os.environ['TENANT_DETAILS_TABLE']))
+
+# Optional read-through cache in front of get_tenant, off unless TENANT_CACHE_TTL_SECONDS
+# is set. Writes made through this module invalidate it, writes made by other processes
+# are only picked up once the entry expires.
+tenant_cache = TTLCache(
+    max_size=int(os.environ.get('TENANT_CACHE_MAX_SIZE', 256)),
+    ttl_seconds=float(os.environ.get('TENANT_CACHE_TTL_SECONDS', 0)))
+tenant_cache_enabled = tenant_cache.ttl_seconds > 0 and tenant_cache.max_size > 0
+_tenant_cache_generation = 0
+_tenant_cache_lock = threading.Lock()
+
+# TransactWriteItems accepts up to 100 items, smaller chunks limit the work redone when
+# one item cancels its transaction
+TRANSACTION_CHUNK_SIZE = min(100, int(os.environ.get('TENANT_TRANSACTION_CHUNK_SIZE', 25)))
+TRANSACTION_MAX_ATTEMPTS = 5
+BATCH_GET_CHUNK_SIZE = 100
+# cancellation reasons of items that did not fail themselves and can be written again
+_RETRYABLE_CANCELLATION_CODES = frozenset([
+    None, 'None', 'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded'])
+
+# Optional hostname index, written only when TENANT_HOSTNAMES_TABLE is set. It maps every
+# hostname of a tenant (the hostnames attribute, custom domains included) to the tenantId
+# and a copy of the attributes below, so the tenant-config service resolves an Origin with
+# a single key lookup. Writes changing any of these attributes keep the index up to date
+# in the same transaction.
+tenant_hostnames_table_name = os.environ.get('TENANT_HOSTNAMES_TABLE')
+HOSTNAME_INDEX_ATTRIBUTES = ('hostnames', 'tenantName', 'tenantConfig')
+MAX_TENANT_HOSTNAMES = 20
+_HOSTNAME = re.compile(r'^(?=.{1,253}$)[a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?(\.[a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?)*$')
+
+
+class TenantConflictError(Exception):
+    pass
+
+
+class HostnameInUseError(TenantConflictError):
+    pass
+
+
+class TenantModifiedError(TenantConflictError):
+    pass
 
 
 @tracer.capture_method
-def get_tenant(tenant_id):
+def get_tenant(tenant_id, consistent_read=False, fields=None):
+    """Returns the get_item response for the tenant, projected to fields if given. When the
+    tenant cache is enabled it is served from there; consistent_read always reads the
+    table, with a strongly consistent read, and refreshes the cache."""
     try:
-        response = tenant_details_table.get_item(Key={'tenantId': tenant_id})
-        return response
+        if not tenant_cache_enabled:
+            return tenant_details_table.get_item(
+                Key={'tenantId': tenant_id}, ConsistentRead=consistent_read,
+                **expression_builder.build_projection(fields))
+
+        item = None if consistent_read else tenant_cache.get(tenant_id)
+        if item is None:
+            generation = _tenant_cache_generation
+            item = tenant_details_table.get_item(
+                Key={'tenantId': tenant_id}, ConsistentRead=consistent_read).get('Item')
+            if item is None:
+                return {}
+            with _tenant_cache_lock:
+                # skip the put if the tenant was written meanwhile, the read may be stale
+                if generation == _tenant_cache_generation:
+                    tenant_cache.put(tenant_id, item)
+        # callers may modify the item, never hand out the cached instance
+        return {'Item': expression_builder.project_item(copy.deepcopy(item), fields)}
     except Exception as e:
         raise Exception('Error getting tenant', e)
 
 
+def invalidate_tenant(*tenant_ids):
+    """Drops tenants from the tenant cache, call it after writing them."""
+    global _tenant_cache_generation
+    if not tenant_cache_enabled:
+        return
+    with _tenant_cache_lock:
+        _tenant_cache_generation += 1
+        for tenant_id in tenant_ids:
+            tenant_cache.invalidate(tenant_id)
+
+
+def get_tenant_cache_stats():
+    return dict(tenant_cache.stats(), enabled=tenant_cache_enabled)
+
+
 @tracer.capture_method
 def create_tenant(event):
     input_details = event
@@ -36,38 +118,328 @@ def create_tenant(event):
         input_item['isActive'] = True
         input_item['taskToken'] = ''
 
-        response = tenant_details_table.put_item(Item=input_item)
+        if tenant_hostnames_table_name and 'hostnames' in input_item:
+            input_item['hostnames'] = normalize_hostnames(input_item['hostnames'])
+            _write_with_hostname_index(
+                {'Put': {'TableName': tenant_details_table.name, 'Item': input_item}},
+                input_item['tenantId'], {}, input_item)
+        else:
+            response = tenant_details_table.put_item(Item=input_item)
+        invalidate_tenant(input_item['tenantId'])
         return input_item
+    except TenantConflictError:
+        raise
     except Exception as e:
         raise Exception("Error creating a new tenant", e)
 
 
 @tracer.capture_method
-def update_tenant(tenantId, tenant):
+def update_tenant(tenantId, tenant, base=None, return_values='NONE'):
+    """Sets the attributes of tenant on the stored tenant. With base, a version of the
+    tenant the caller read, only the attributes that differ from it are written, on the
+    condition that every attribute of tenant still holds its value in base; nothing is
+    written when none differs. An update that also refreshes the hostname index is
+    written in one transaction with it, on the condition that the indexed attributes
+    still hold their values in base, and returns an empty response. TenantModifiedError
+    means the conditioned attributes changed since base was read."""
     try:
-        # Remove the tenantId if the incoming object has one
-        input_details = {key: tenant[key] for key in tenant if key != 'tenantId'}
-        update_expression = []
-        update_expression.append("set ")
-        expression_attribute_values = {}
-        for key, value in input_details.items():
-            key_variable = f":{key}Variable"
-            update_expression.append(''.join([key, " = ", key_variable]))
-            update_expression.append(",")
-            expression_attribute_values[key_variable] = value
-
-        # remove the last comma
-        update_expression.pop()
-
-        response_update = tenant_details_table.update_item(
-            Key={
-                'tenantId': tenantId,
-            },
-            UpdateExpression=''.join(update_expression),
-            ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="UPDATED_NEW"
-        )
+        # Remove the tenantId if the incoming object has one.
+        tenant = {key: value for key, value in tenant.items() if key != 'tenantId'}
+        if tenant_hostnames_table_name and 'hostnames' in tenant:
+            tenant['hostnames'] = normalize_hostnames(tenant['hostnames'])
+        # Keys are used as top level attribute names, whatever characters they contain.
+        input_details = {(key,): value for key, value in tenant.items()}
+        update = expression_builder.build_update(input_details, base=base, return_values=return_values)
+        if update is None:
+            return {}
+        # attributes left out because they equal base must not have been changed meanwhile
+        condition_keys = list(tenant) if base is not None else []
+
+        if tenant_hostnames_table_name and any(
+                key in tenant and (base is None or base.get(key) != tenant[key])
+                for key in HOSTNAME_INDEX_ATTRIBUTES):
+            previous = base if base is not None else tenant_details_table.get_item(
+                Key={'tenantId': tenantId}, ConsistentRead=True).get('Item', {})
+            update.pop('ReturnValues')
+            _add_unchanged_condition(update, previous, list(
+                dict.fromkeys(list(HOSTNAME_INDEX_ATTRIBUTES) + condition_keys)))
+            _write_with_hostname_index(
+                {'Update': {'TableName': tenant_details_table.name, 'Key': {'tenantId': tenantId}, **update}},
+                tenantId, previous, {**previous, **tenant})
+            invalidate_tenant(tenantId)
+            return {}
+
+        if condition_keys:
+            _add_unchanged_condition(update, base, condition_keys)
+        try:
+            response_update = tenant_details_table.update_item(
+                Key={
+                    'tenantId': tenantId,
+                },
+                **update
+            )
+        except Exception as e:
+            if condition_keys and _error_code(e) == 'ConditionalCheckFailedException':
+                raise TenantModifiedError(
+                    'Tenant {} was modified concurrently, read it again and retry'.format(tenantId))
+            raise
+        invalidate_tenant(tenantId)
 
         return response_update
+    except TenantConflictError:
+        raise
     except Exception as e:
         raise Exception("Error updating tenant", e)
+
+
+def normalize_hostnames(hostnames):
+    """Returns the hostnames attribute of a tenant lowercased, without trailing dots and
+    duplicates. Raises ValueError unless it is a list of at most MAX_TENANT_HOSTNAMES
+    hostnames, given without scheme or port."""
+    if hostnames is None:
+        return []
+    if not isinstance(hostnames, list) or len(hostnames) > MAX_TENANT_HOSTNAMES:
+        raise ValueError('hostnames must be a list of at most {} hostnames'.format(MAX_TENANT_HOSTNAMES))
+    normalized = []
+    for hostname in hostnames:
+        value = hostname.strip().lower().rstrip('.') if isinstance(hostname, str) else ''
+        if not _HOSTNAME.match(value):
+            raise ValueError('Invalid hostname: {}'.format(hostname))
+        normalized.append(value)
+    return list(dict.fromkeys(normalized))
+
+
+def find_claimed_hostnames(hostnames):
+    """Returns {hostname: tenantId} for the hostnames the hostname index already assigns to
+    a tenant, so a new tenant can be refused before its onboarding starts."""
+    if not tenant_hostnames_table_name or not hostnames:
+        return {}
+    client = tenant_details_table.meta.client
+    claimed = {}
+    for start in range(0, len(hostnames), BATCH_GET_CHUNK_SIZE):
+        request = {tenant_hostnames_table_name: {
+            'Keys': [{'hostname': hostname} for hostname in hostnames[start:start + BATCH_GET_CHUNK_SIZE]],
+            'ConsistentRead': True,
+            'ProjectionExpression': 'hostname, tenantId',
+        }}
+        for attempt in range(TRANSACTION_MAX_ATTEMPTS):
+            response = throttling.call_with_backoff(lambda: client.batch_get_item(RequestItems=request))
+            for item in response.get('Responses', {}).get(tenant_hostnames_table_name, []):
+                claimed[item['hostname']] = item['tenantId']
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+            throttling.backoff_sleep(attempt)
+        else:
+            raise Exception('Error reading hostnames, keys left unprocessed', request)
+    return claimed
+
+
+def _add_unchanged_condition(update, previous, keys=HOSTNAME_INDEX_ATTRIBUTES):
+    # Writes derived from previous (the index entries, or a diff against it) are only
+    # valid while keys still hold their values in previous; a concurrent write may have
+    # changed them since it was read. Otherwise index entries of removed hostnames could
+    # be left behind, or a diff could skip an attribute another writer just changed.
+    clauses = []
+    for index, key in enumerate(keys):
+        name = '#c{}'.format(index)
+        update['ExpressionAttributeNames'][name] = key
+        if key in previous:
+            update.setdefault('ExpressionAttributeValues', {})[':c{}'.format(index)] = previous[key]
+            clauses.append('{} = :c{}'.format(name, index))
+        else:
+            clauses.append('attribute_not_exists({})'.format(name))
+    update['ConditionExpression'] = ' AND '.join(clauses)
+
+
+def _write_with_hostname_index(tenant_write, tenant_id, previous, current):
+    # Hostnames are claimed with a condition, a hostname of another tenant cancels the
+    # whole transaction and the tenant is not written either.
+    owned_by_tenant = {
+        'ConditionExpression': 'attribute_not_exists(hostname) OR tenantId = :tenantId',
+        'ExpressionAttributeValues': {':tenantId': tenant_id},
+    }
+    entry = {'tenantId': tenant_id}
+    entry.update({key: current[key] for key in HOSTNAME_INDEX_ATTRIBUTES
+                  if key in current and key != 'hostnames'})
+    hostnames = current.get('hostnames') or []
+    transact_items = [tenant_write]
+    transact_items.extend(
+        {'Put': {'TableName': tenant_hostnames_table_name, 'Item': {'hostname': hostname, **entry},
+                 **owned_by_tenant}}
+        for hostname in hostnames)
+    transact_items.extend(
+        {'Delete': {'TableName': tenant_hostnames_table_name, 'Key': {'hostname': hostname},
+                    **owned_by_tenant}}
+        for hostname in previous.get('hostnames') or [] if hostname not in hostnames)
+
+    client = tenant_details_table.meta.client
+    while True:
+        try:
+            throttling.call_with_backoff(lambda: client.transact_write_items(TransactItems=transact_items),
+                                         retryable=_is_retryable_transaction_error)
+            return
+        except Exception as e:
+            reasons = (getattr(e, 'response', None) or {}).get('CancellationReasons') or []
+            stale_deletes = []
+            for transact_item, reason in zip(transact_items, reasons):
+                if reason.get('Code') != 'ConditionalCheckFailed':
+                    continue
+                if transact_item is tenant_write:
+                    raise TenantModifiedError(
+                        'Tenant {} was modified concurrently, read it again and retry'.format(tenant_id))
+                if 'Put' in transact_item:
+                    raise HostnameInUseError(
+                        'Hostname {} belongs to another tenant'.format(transact_item['Put']['Item']['hostname']))
+                stale_deletes.append(transact_item)
+            if not stale_deletes:
+                raise
+            # the removed hostnames were claimed by another tenant meanwhile, their index
+            # entries are no longer ours to delete
+            logger.warning({'message': 'Skipping index entries of hostnames owned by another tenant',
+                            'hostnames': [item['Delete']['Key']['hostname'] for item in stale_deletes]})
+            transact_items = [item for item in transact_items if not any(item is stale for stale in stale_deletes)]
+
+
+def _error_code(error):
+    return (getattr(error, 'response', None) or {}).get('Error', {}).get('Code')
+
+
+def _is_retryable_transaction_error(error):
+    response = getattr(error, 'response', None) or {}
+    if response.get('Error', {}).get('Code') == 'TransactionCanceledException':
+        return all(reason.get('Code') in _RETRYABLE_CANCELLATION_CODES
+                   for reason in response.get('CancellationReasons') or [])
+    return throttling.is_throttling_error(error)
+
+
+@tracer.capture_method
+def transition_status(tenant_id, step, attributes=None, timestamp=None, return_values='NONE'):
+    """Records step in the tenantStatus map of the tenant with a nested
+    SET tenantStatus.#step = :ts, and sets the given attributes in the same write. The item
+    is not read first, and concurrent transitions cannot overwrite each other's fields.
+    Returns the update_item response."""
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    changes = {('tenantStatus', step): timestamp}
+    changes.update({(key,): value for key, value in (attributes or {}).items()})
+
+    try:
+        response = tenant_details_table.update_item(
+            Key={'tenantId': tenant_id},
+            ConditionExpression='attribute_exists(tenantId)',
+            **expression_builder.build_update(changes, return_values=return_values)
+        )
+        invalidate_tenant(tenant_id)
+        return response
+    except Exception as e:
+        raise Exception("Error updating tenant status", e)
+
+
+@tracer.capture_method
+def transact_update_tenants(tenant_ids, update_expression, expression_attribute_values,
+                            expression_attribute_names=None):
+    """Applies the same update to every tenant in tenant_ids with TransactWriteItems, one
+    chunk of TRANSACTION_CHUNK_SIZE tenants at a time. Only existing tenants are updated.
+    Returns {tenantId: None when updated, else an error message}."""
+    results = {}
+    for start in range(0, len(tenant_ids), TRANSACTION_CHUNK_SIZE):
+        update = {
+            'TableName': tenant_details_table.name,
+            'UpdateExpression': update_expression,
+            'ConditionExpression': 'attribute_exists(tenantId)',
+            'ExpressionAttributeValues': expression_attribute_values,
+        }
+        if expression_attribute_names:
+            update['ExpressionAttributeNames'] = expression_attribute_names
+        results.update(_transact_update_chunk(tenant_ids[start:start + TRANSACTION_CHUNK_SIZE], update))
+    invalidate_tenant(*tenant_ids)
+    return results
+
+
+def _transact_update_chunk(tenant_ids, update):
+    # A transaction is all or nothing. When it is cancelled, CancellationReasons holds one
+    # entry per item, in order: items that failed on their own get their error, and the
+    # transaction is retried with the rest.
+    client = tenant_details_table.meta.client
+    results = {}
+    pending = list(tenant_ids)
+    for attempt in range(1, TRANSACTION_MAX_ATTEMPTS + 1):
+        transact_items = [{'Update': {**update, 'Key': {'tenantId': tenant_id}}} for tenant_id in pending]
+        try:
+            throttling.call_with_backoff(lambda: client.transact_write_items(TransactItems=transact_items))
+        except Exception as e:
+            response = getattr(e, 'response', None) or {}
+            reasons = response.get('CancellationReasons')
+            if response.get('Error', {}).get('Code') != 'TransactionCanceledException' or not reasons:
+                results.update({tenant_id: str(e) for tenant_id in pending})
+                return results
+
+            retry = []
+            for tenant_id, reason in zip(pending, reasons):
+                code = reason.get('Code')
+                if code == 'ConditionalCheckFailed':
+                    results[tenant_id] = 'Tenant not found'
+                elif code in _RETRYABLE_CANCELLATION_CODES:
+                    retry.append(tenant_id)
+                else:
+                    results[tenant_id] = reason.get('Message') or code
+            pending = retry
+            if not pending:
+                return results
+            logger.info({'message': 'Retrying cancelled tenant transaction', 'attempt': attempt,
+                         'tenants': len(pending)})
+            throttling.backoff_sleep(attempt)
+        else:
+            results.update({tenant_id: None for tenant_id in pending})
+            return results
+
+    results.update({tenant_id: 'Transaction kept being cancelled' for tenant_id in pending})
+    return results
+
+
+@tracer.capture_method
+def batch_get_tenants(tenant_ids, fields=None):
+    """Reads the tenants in tenant_ids with strongly consistent BatchGetItem calls, 100 keys
+    per call, retrying unprocessed keys. Returns ({tenantId: item} for the tenants that
+    exist, [tenantIds that could not be read]). Keys still unprocessed after the retries,
+    or of a call that failed, are returned as unread instead of raising, so callers that
+    already wrote the tenants can report them one by one."""
+    client = tenant_details_table.meta.client
+    table_name = tenant_details_table.name
+    items = {}
+    unread = []
+    for start in range(0, len(tenant_ids), BATCH_GET_CHUNK_SIZE):
+        request = {table_name: {
+            'Keys': [{'tenantId': tenant_id} for tenant_id in tenant_ids[start:start + BATCH_GET_CHUNK_SIZE]],
+            'ConsistentRead': True,
+            **expression_builder.build_projection(fields),
+        }}
+        try:
+            for attempt in range(TRANSACTION_MAX_ATTEMPTS):
+                response = throttling.call_with_backoff(lambda: client.batch_get_item(RequestItems=request))
+                for item in response.get('Responses', {}).get(table_name, []):
+                    items[item['tenantId']] = item
+                request = response.get('UnprocessedKeys')
+                if not request:
+                    break
+                throttling.backoff_sleep(attempt)
+        except Exception:
+            logger.exception('Error reading tenants')
+        if request:
+            unread.extend(key['tenantId'] for key in request[table_name]['Keys'])
+    return items, unread
+
+
+@tracer.capture_method
+def find_tenant_ids(conditions, max_results):
+    """Scans for the ids of tenants whose attributes equal the values in conditions.
+    Returns at most max_results + 1 ids, so callers can tell when a filter matches too many."""
+    scan_kwargs = expression_builder.build_equality_filter(conditions)
+    scan_kwargs['ProjectionExpression'] = 'tenantId'
+    tenant_ids = []
+    while True:
+        response = tenant_details_table.scan(**scan_kwargs)
+        tenant_ids.extend(item['tenantId'] for item in response['Items'])
+        if len(tenant_ids) > max_results or not response.get('LastEvaluatedKey'):
+            return tenant_ids[:max_results + 1]
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
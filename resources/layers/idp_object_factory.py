@@ -25,4 +25,16 @@ def get_idp_authorizer_object(idp_name):
     if (idp_name.upper() == 'COGNITO'):
         idp_impl_class = getattr(importlib.import_module("cognito.cognito_authorizer"), "CognitoAuthorizer")
 
-    return idp_impl_class() 
\ No newline at end of file
+    return idp_impl_class()
+
+def get_jwt_verifier_object(engine_name):
+
+    jwt_verifier_class = ''
+    if (engine_name.upper() == 'CRYPTOGRAPHY'):
+        jwt_verifier_class = getattr(importlib.import_module("jwt_verifiers.cryptography_jwt_verifier"), "CryptographyJwtVerifier")
+    elif (engine_name.upper() == 'JOSE'):
+        jwt_verifier_class = getattr(importlib.import_module("jwt_verifiers.jose_jwt_verifier"), "JoseJwtVerifier")
+    else:
+        raise ValueError("Unknown JWT verifier engine {}, expected CRYPTOGRAPHY or JOSE".format(engine_name))
+
+    return jwt_verifier_class()
@@ -0,0 +1,53 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import base64
+import binascii
+import json
+from collections.abc import Mapping
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from abstract_classes.jwt_verifier_abstract_class import DecodedJwt, JwtDecodeError, JwtVerifierAbstractClass
+
+
+class CryptographyJwtVerifier(JwtVerifierAbstractClass):
+    """Single-parse verification: header and payload are decoded exactly once and
+    RS256 signatures are checked directly with the cryptography primitives.
+    Token splitting and base64url decoding mirror python-jose, so both engines
+    accept and reject the same tokens."""
+
+    def decode(self, token):
+        try:
+            if isinstance(token, str):
+                token = token.encode('utf-8')
+            signing_input, encoded_signature = token.rsplit(b'.', 1)
+            encoded_headers, encoded_claims = signing_input.split(b'.', 1)
+            headers = json.loads(_base64url_decode(encoded_headers).decode('utf-8'))
+            claims = json.loads(_base64url_decode(encoded_claims).decode('utf-8'))
+            signature = _base64url_decode(encoded_signature)
+        except (ValueError, TypeError, binascii.Error, UnicodeDecodeError) as e:
+            raise JwtDecodeError(e)
+        if not isinstance(headers, Mapping) or not isinstance(claims, Mapping):
+            raise JwtDecodeError('Token header and claims must be JSON objects')
+        return DecodedJwt(headers, claims, signing_input, signature)
+
+    def load_key(self, key):
+        if key.get('kty') != 'RSA':
+            raise ValueError('Only RSA keys are supported')
+        return rsa.RSAPublicNumbers(_base64url_to_int(key['e']), _base64url_to_int(key['n'])).public_key()
+
+    def verify(self, key, signing_input, signature):
+        try:
+            key.verify(signature, signing_input, padding.PKCS1v15(), hashes.SHA256())
+            return True
+        except InvalidSignature:
+            return False
+
+
+def _base64url_decode(data):
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def _base64url_to_int(value):
+    return int.from_bytes(_base64url_decode(value.encode('utf-8')), 'big')
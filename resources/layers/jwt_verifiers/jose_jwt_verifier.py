@@ -0,0 +1,29 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+from jose.utils import base64url_decode
+from abstract_classes.jwt_verifier_abstract_class import DecodedJwt, JwtDecodeError, JwtVerifierAbstractClass
+
+
+class JoseJwtVerifier(JwtVerifierAbstractClass):
+    """Verification through python-jose. Kept as a fallback for the cryptography engine."""
+
+    def decode(self, token):
+        try:
+            headers = jwt.get_unverified_headers(token)
+            claims = jwt.get_unverified_claims(token)
+            # get the last two sections of the token,
+            # message and signature (encoded in base64)
+            message, encoded_signature = str(token).rsplit('.', 1)
+            signature = base64url_decode(encoded_signature.encode('utf-8'))
+        except (JWTError, ValueError) as e:
+            raise JwtDecodeError(e)
+        return DecodedJwt(headers, claims, message.encode('utf-8'), signature)
+
+    def load_key(self, key):
+        return jwk.construct(key, 'RS256')
+
+    def verify(self, key, signing_input, signature):
+        return key.verify(signing_input, signature)
@@ -0,0 +1,67 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import importlib
+import os
+import threading
+import time
+from aws_lambda_powertools import Logger
+
+logger = Logger()
+
+# with LAZY_INIT=true clients, tables and heavy modules are only created on first use
+LAZY_INIT_ENABLED = os.environ.get('LAZY_INIT', 'false').lower() == 'true'
+
+init_started = time.perf_counter()
+_init_recorded = set()
+
+
+class LazyObject:
+    """Proxy that builds the wrapped object with factory on first attribute access."""
+
+    __slots__ = ('_factory', '_instance', '_lock')
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _get_instance(self):
+        instance = object.__getattribute__(self, '_instance')
+        if instance is None:
+            with object.__getattribute__(self, '_lock'):
+                instance = object.__getattribute__(self, '_instance')
+                if instance is None:
+                    instance = object.__getattribute__(self, '_factory')()
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._get_instance(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get_instance(), name, value)
+
+
+def lazy(factory):
+    """Returns factory() right away, or a LazyObject deferring the call when lazy init is enabled."""
+    if LAZY_INIT_ENABLED:
+        return LazyObject(factory)
+    return factory()
+
+
+def lazy_import(module_name):
+    return lazy(lambda: importlib.import_module(module_name))
+
+
+def record_init_duration(handler_name):
+    """Logs how long the handler module took to initialize, measured from the import of this
+    module. Call it once at the end of the handler module."""
+    if handler_name in _init_recorded:
+        return
+    _init_recorded.add(handler_name)
+    logger.info({
+        'handler': handler_name,
+        'initDurationMs': round((time.perf_counter() - init_started) * 1000, 2),
+        'lazyInit': LAZY_INIT_ENABLED,
+    })
@@ -0,0 +1,73 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+import io
+import json
+import os
+from http import HTTPStatus
+
+import simplejson
+from aws_lambda_powertools.event_handler import Response
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+NEXT_TOKEN_HEADER = 'x-next-token'
+# stays below the 6 MB synchronous Lambda response limit, headers and envelope included
+MAX_RESPONSE_BYTES = int(os.environ.get('NDJSON_MAX_RESPONSE_BYTES', 5 * 1024 * 1024))
+# largest limit an NDJSON listing accepts, responses are also bounded by MAX_RESPONSE_BYTES
+MAX_RECORDS = int(os.environ.get('NDJSON_MAX_RECORDS', 10000))
+
+
+def accepts_ndjson(headers):
+    """True if the Accept header of the request asks for NDJSON."""
+    for name, value in (headers or {}).items():
+        if name.lower() == 'accept' and value and NDJSON_CONTENT_TYPE in value.lower():
+            return True
+    return False
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if hasattr(value, '__dict__'):
+        return value.__dict__
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+class NdjsonWriter:
+    """Serializes records one line at a time as they are added, so a listing never has to
+    be held as a list of records. add() refuses a record that would push the response
+    past max_bytes; the caller then ends the response with a continuation token."""
+
+    def __init__(self, max_bytes=None, max_records=None):
+        self.max_bytes = MAX_RESPONSE_BYTES if max_bytes is None else max_bytes
+        self.max_records = max_records
+        self.count = 0
+        self._size = 0
+        self._buffer = io.StringIO()
+
+    def is_full(self):
+        return self.max_records is not None and self.count >= self.max_records
+
+    def add(self, record):
+        if self.is_full():
+            return False
+        line = simplejson.dumps(record, use_decimal=True, default=_default) + '\n'
+        # the body travels as a JSON string in the Lambda response, so count its escaped size
+        size = len(json.dumps(line)) - 2
+        if self._size + size > self.max_bytes:
+            if self.count == 0:
+                raise ValueError('A single record exceeds the NDJSON response limit of {} bytes'.format(
+                    self.max_bytes))
+            return False
+        self._buffer.write(line)
+        self._size += size
+        self.count += 1
+        return True
+
+    def response(self, next_token=None):
+        headers = {NEXT_TOKEN_HEADER: next_token} if next_token else None
+        return Response(status_code=HTTPStatus.OK.value,
+                        content_type=NDJSON_CONTENT_TYPE,
+                        body=self._buffer.getvalue(),
+                        headers=headers)
@@ -0,0 +1,154 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import abc
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_lambda_powertools import Logger
+
+logger = Logger()
+
+
+class CheckpointedExport(abc.ABC):
+    """Base of the exports that page several disjoint parts of a source concurrently and
+    append every page to an NDJSON output as soon as it arrives. A subclass names its
+    parts, implements _export_part and calls _write_page for every page it reads.
+
+    With a checkpoint_path the position of each part is saved after every page, so an
+    interrupted export resumes where it stopped instead of starting over; the checkpoint
+    is removed once the export completes. When output is a file path, the checkpoint also
+    records the file size and a resumed export truncates the file to it, so no record is
+    written twice. A stream output cannot be truncated, and the pages written after the
+    last checkpoint are exported again on resume."""
+
+    # names used in the logs and the statistics, e.g. 'Tenant export', 'items', 'segments'
+    label = 'Export'
+    record_name = 'records'
+    part_name = 'parts'
+
+    def __init__(self, output, parts, max_workers, checkpoint_path=None, progress_callback=None,
+                 progress_interval_seconds=10, counters=()):
+        self.output = output
+        self.parts = [str(part) for part in parts]
+        self.max_workers = max_workers
+        self.checkpoint_path = checkpoint_path
+        self.progress_callback = progress_callback
+        self.progress_interval_seconds = progress_interval_seconds
+        self._lock = threading.Lock()
+        self._stream = None
+        self._parts = {}
+        self._stats = {'records': 0, 'pages': 0, **{counter: 0.0 for counter in counters}}
+        self._started = None
+        self._last_progress = 0.0
+
+    def run(self):
+        """Runs the export and returns its throughput statistics."""
+        checkpoint = self._load_checkpoint()
+        self._parts = checkpoint['parts']
+        self._stream = self._open_output(checkpoint.get('outputOffset'))
+        self._started = time.perf_counter()
+        try:
+            pending = [part for part in self.parts if not self._parts[part]['done']]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(pending), 1))) as executor:
+                # list() re-raises the first exception of a failed part
+                list(executor.map(lambda part: self._export_part(part, self._parts[part]['position']), pending))
+        finally:
+            if isinstance(self.output, str):
+                self._stream.close()
+            else:
+                self._stream.flush()
+
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            # a completed export leaves nothing to resume
+            os.remove(self.checkpoint_path)
+        stats = self.stats()
+        logger.info({'message': self.label + ' finished', **stats})
+        return stats
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self._started if self._started else 0.0
+            records = self._stats['records']
+            return {
+                self.record_name: records,
+                **{name: value for name, value in self._stats.items() if name != 'records'},
+                self.part_name + 'Done': sum(1 for part in self._parts.values() if part['done']),
+                'total' + self.part_name[:1].upper() + self.part_name[1:]: len(self.parts),
+                'elapsedSeconds': round(elapsed, 3),
+                self.record_name + 'PerSecond': round(records / elapsed, 1) if elapsed else 0.0,
+            }
+
+    @abc.abstractmethod
+    def checkpoint_identity(self):
+        """Returns the settings a checkpoint must match to be resumed by this export."""
+        pass
+
+    @abc.abstractmethod
+    def _export_part(self, part, position):
+        """Exports part from position (None at the start), calling _write_page per page."""
+        pass
+
+    def _write_page(self, part, lines, record_count, position, **counters):
+        # the page and the part position are recorded together, so the checkpoint
+        # always matches what has been written to the output; a None position ends the part
+        with self._lock:
+            self._stream.write(lines)
+            self._stream.flush()
+            state = self._parts[part]
+            state['position'] = position
+            state['done'] = not position
+            state['records'] += record_count
+            self._stats['records'] += record_count
+            self._stats['pages'] += 1
+            for counter, value in counters.items():
+                self._stats[counter] += value
+            self._save_checkpoint()
+            report_progress = time.perf_counter() - self._last_progress >= self.progress_interval_seconds
+            if report_progress:
+                self._last_progress = time.perf_counter()
+        if report_progress:
+            stats = self.stats()
+            logger.info({'message': self.label + ' progress', **stats})
+            if self.progress_callback:
+                self.progress_callback(stats)
+
+    def _open_output(self, offset):
+        if not isinstance(self.output, str):
+            return self.output
+        if offset is None:
+            return open(self.output, 'w', encoding='utf-8')
+        stream = open(self.output, 'r+', encoding='utf-8')
+        stream.seek(offset)
+        stream.truncate()
+        return stream
+
+    def _load_checkpoint(self):
+        fresh = {'parts': {part: {'position': None, 'done': False, 'records': 0} for part in self.parts}}
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return fresh
+
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        identity = self.checkpoint_identity()
+        found = {name: checkpoint.get(name) for name in identity}
+        if found != identity:
+            raise ValueError('Checkpoint {} belongs to another export ({})'.format(self.checkpoint_path, found))
+        logger.info({'message': 'Resuming ' + self.label.lower(), 'checkpoint': self.checkpoint_path})
+        return checkpoint
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        checkpoint = {
+            **self.checkpoint_identity(),
+            'outputOffset': self._stream.tell() if isinstance(self.output, str) else None,
+            'parts': self._parts,
+        }
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temporary_path, self.checkpoint_path)
@@ -0,0 +1,101 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import threading
+import aws_clients
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+
+_signing_key = None
+_signing_key_lock = threading.Lock()
+
+
+class InvalidPaginationParameter(ValueError):
+    pass
+
+
+def parse_limit(value, default=None, maximum=None):
+    """Returns the page size requested through the limit query parameter, capped at
+    maximum (MAX_PAGE_SIZE). Without a limit the default page size is used."""
+    default = DEFAULT_PAGE_SIZE if default is None else default
+    maximum = MAX_PAGE_SIZE if maximum is None else maximum
+    if value is None or value == '':
+        return min(default, maximum)
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPaginationParameter('limit must be an integer')
+    if limit < 1:
+        raise InvalidPaginationParameter('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def encode_next_token(last_evaluated_key, scope):
+    """Turns a DynamoDB LastEvaluatedKey into an opaque nextToken. The token is signed
+    together with scope (e.g. the listing it belongs to), so it cannot be altered or
+    replayed against another listing. Returns None when there is no next page."""
+    if not last_evaluated_key:
+        return None
+    from boto3.dynamodb.types import TypeSerializer
+
+    serializer = TypeSerializer()
+    key = {name: serializer.serialize(value) for name, value in last_evaluated_key.items()}
+    payload = _b64encode(json.dumps(key, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return payload + '.' + _b64encode(_sign(scope, payload))
+
+
+def decode_next_token(token, scope):
+    """Returns the ExclusiveStartKey carried by a token from encode_next_token, or None
+    for an empty token. Raises InvalidPaginationParameter for tampered or foreign tokens."""
+    if not token:
+        return None
+    from boto3.dynamodb.types import TypeDeserializer
+
+    payload, _, signature = token.partition('.')
+    try:
+        valid = hmac.compare_digest(_b64decode(signature), _sign(scope, payload))
+        key = json.loads(_b64decode(payload)) if valid else None
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        valid, key = False, None
+    if not valid or not isinstance(key, dict):
+        raise InvalidPaginationParameter('nextToken is invalid')
+
+    deserializer = TypeDeserializer()
+    try:
+        return {name: deserializer.deserialize(value) for name, value in key.items()}
+    except (TypeError, AttributeError):
+        raise InvalidPaginationParameter('nextToken is invalid')
+
+
+def _sign(scope, payload):
+    return hmac.new(_get_signing_key(), (scope + '.' + payload).encode('utf-8'), hashlib.sha256).digest()
+
+
+def _get_signing_key():
+    # PAGINATION_TOKEN_SECRET is meant for local runs, deployed functions read the secret
+    # referenced by PAGINATION_TOKEN_SECRET_ARN once per container
+    global _signing_key
+    if _signing_key is None:
+        with _signing_key_lock:
+            if _signing_key is None:
+                secret = os.environ.get('PAGINATION_TOKEN_SECRET')
+                if secret is None:
+                    secret = aws_clients.get_client('secretsmanager').get_secret_value(
+                        SecretId=os.environ['PAGINATION_TOKEN_SECRET_ARN'])['SecretString']
+                _signing_key = secret.encode('utf-8')
+    return _signing_key
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import random
+import threading
+import time
+
+# error codes AWS services use to signal throttling or a transient capacity shortage
+THROTTLING_ERROR_CODES = frozenset([
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException',
+    'LimitExceededException',
+])
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing rate_per_second calls on average with bursts of up
+    to burst calls. acquire() blocks until a call is allowed."""
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate_per_second = float(rate_per_second)
+        self.burst = float(burst if burst is not None else max(1.0, rate_per_second))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate_per_second
+            time.sleep(wait)
+
+
+def is_throttling_error(error):
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+def call_with_backoff(function, max_attempts=5, base_delay_seconds=0.1, max_delay_seconds=5.0,
+                      retryable=is_throttling_error):
+    """Calls function() and retries it with exponential backoff and full jitter while it
+    raises errors accepted by retryable. This sits on top of the SDK retries, for callers
+    that fan out many calls and need to spread them out once the service pushes back."""
+    attempt = 1
+    while True:
+        try:
+            return function()
+        except Exception as e:
+            if attempt >= max_attempts or not retryable(e):
+                raise
+            backoff_sleep(attempt, base_delay_seconds, max_delay_seconds)
+            attempt += 1
+
+
+def backoff_sleep(attempt, base_delay_seconds=0.1, max_delay_seconds=5.0):
+    """Sleeps for an exponentially growing, fully jittered delay."""
+    time.sleep(random.uniform(0, min(max_delay_seconds, base_delay_seconds * 2 ** attempt)))  # nosec B311 # jitter only
@@ -0,0 +1,75 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded, in-process LRU cache whose entries expire after a TTL.
+
+    Each entry can carry its own absolute expiry (epoch seconds) so callers can
+    bind an entry to an external deadline such as a token's exp claim. Expired
+    entries are never returned. The least recently used entry is evicted once
+    max_size is reached; a max_size of 0 disables the cache."""
+
+    def __init__(self, max_size, ttl_seconds):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value, ttl_seconds=None, expires_at=None):
+        """Stores value under key. The entry expires after ttl_seconds (the
+        cache default if not given), or at expires_at if that is earlier."""
+        if self.max_size <= 0:
+            return
+        deadline = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            self._entries[key] = (value, deadline)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'size': len(self._entries),
+            'hitRate': self._hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,215 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Offline throughput/latency benchmark of the control plane authorizer.
+
+Tokens are signed with locally generated RSA keys and the JWKS is served by an
+in-process stand-in, so no Cognito user pool or network access is needed.
+
+    pip install -r resources/layers/requirements.txt
+    python scripts/benchmarks/authorizer_benchmark.py --iterations 2000
+    python scripts/benchmarks/authorizer_benchmark.py --save-baseline baseline.json
+    python scripts/benchmarks/authorizer_benchmark.py --baseline baseline.json --max-regression 0.2
+
+With --baseline the script exits with status 1 if the throughput of any
+scenario dropped, or its p99 latency grew, by more than --max-regression."""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'resources', 'functions'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'resources', 'layers'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cognito_tokens import CognitoTokenFactory  # noqa: E402
+
+SCENARIOS = ['cold-cache', 'warm-cache', 'expired-token', 'wrong-audience', 'unknown-kid']
+TARGETS = ['validate', 'handler']
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:benchmarkapi/prod/GET/tenants'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=1000, help='measured calls per scenario')
+    parser.add_argument('--warmup', type=int, default=50, help='unmeasured calls per scenario')
+    parser.add_argument('--distinct-tokens', type=int, default=1,
+                        help='size of the token pool cycled through in the warm-cache scenario')
+    parser.add_argument('--jwks-latency-ms', type=float, default=0.0,
+                        help='simulated latency of the JWKS stand-in, e.g. 40 to mimic a real fetch')
+    parser.add_argument('--engine', choices=['cryptography', 'jose'], default='cryptography',
+                        help='JWT verification engine (JWT_VERIFIER_ENGINE)')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=TARGETS)
+    parser.add_argument('--json', dest='json_path', help='write the results to this file')
+    parser.add_argument('--save-baseline', help='write the results as a baseline to this file')
+    parser.add_argument('--baseline', help='compare the results against this baseline file')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='tolerated relative regression against the baseline (default 0.2)')
+    return parser.parse_args()
+
+
+def load_authorizer(factory, jwks_latency_ms, engine):
+    os.environ.setdefault('AWS_DEFAULT_REGION', factory.region)
+    os.environ.setdefault('POWERTOOLS_LOG_LEVEL', 'CRITICAL')
+    os.environ['SYS_ADMIN_ROLE_NAME'] = 'SystemAdmin'
+    os.environ['IDP_NAME'] = 'COGNITO'
+    os.environ['IDP_DETAILS'] = json.dumps(factory.idp_details())
+    os.environ['JWT_VERIFIER_ENGINE'] = engine
+
+    import custom_authorizer
+
+    jwks = factory.jwks()
+
+    def jwks_stand_in(user_pool_id):
+        if jwks_latency_ms:
+            time.sleep(jwks_latency_ms / 1000.0)
+        return jwks
+
+    custom_authorizer.idp_authorizer_service.jwks_cache.fetcher = jwks_stand_in
+    return custom_authorizer
+
+
+def build_tokens(factory, scenario, count):
+    if scenario in ('cold-cache', 'warm-cache'):
+        return [factory.id_token() for _ in range(count)]
+    if scenario == 'expired-token':
+        return [factory.expired_id_token()]
+    if scenario == 'wrong-audience':
+        return [factory.wrong_audience_id_token()]
+    if scenario == 'unknown-kid':
+        return [factory.unknown_kid_id_token()]
+    raise ValueError(scenario)
+
+
+def reset_caches(custom_authorizer):
+    custom_authorizer.idp_authorizer_service.jwks_cache.clear()
+    custom_authorizer.decision_cache.clear()
+
+
+def make_call(target, custom_authorizer, factory):
+    authorizer = custom_authorizer.idp_authorizer_service
+    idp_details = factory.idp_details()
+
+    if target == 'validate':
+        def call(token):
+            return authorizer.validateJWT({'jwtToken': token, 'idpDetails': idp_details}) is not False
+    else:
+        def call(token):
+            try:
+                custom_authorizer.lambda_handler(
+                    {'authorizationToken': 'Bearer ' + token, 'methodArn': METHOD_ARN}, None)
+                return True
+            except Exception:
+                return False
+    return call
+
+
+def run_scenario(target, scenario, args, factory, custom_authorizer):
+    pool_size = args.distinct_tokens if scenario == 'warm-cache' else 1
+    tokens = build_tokens(factory, scenario, pool_size)
+    call = make_call(target, custom_authorizer, factory)
+    cold = scenario == 'cold-cache'
+
+    reset_caches(custom_authorizer)
+    for i in range(args.warmup):
+        if cold:
+            reset_caches(custom_authorizer)
+        call(tokens[i % len(tokens)])
+
+    latencies = []
+    accepted = 0
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        if cold:
+            reset_caches(custom_authorizer)
+        token = tokens[i % len(tokens)]
+        call_started = time.perf_counter_ns()
+        accepted += call(token)
+        latencies.append(time.perf_counter_ns() - call_started)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'target': target,
+        'scenario': scenario,
+        'iterations': args.iterations,
+        'accepted': accepted,
+        'validationsPerSecond': args.iterations / elapsed if elapsed else 0.0,
+        'p50Ms': percentile(latencies, 50) / 1e6,
+        'p99Ms': percentile(latencies, 99) / 1e6,
+        'meanMs': statistics.fmean(latencies) / 1e6,
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def print_results(results):
+    header = '{:<10} {:<16} {:>10} {:>14} {:>10} {:>10}'.format(
+        'target', 'scenario', 'accepted', 'validations/s', 'p50 ms', 'p99 ms')
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print('{:<10} {:<16} {:>10} {:>14.1f} {:>10.3f} {:>10.3f}'.format(
+            result['target'], result['scenario'], result['accepted'],
+            result['validationsPerSecond'], result['p50Ms'], result['p99Ms']))
+
+
+def compare_with_baseline(results, baseline_path, max_regression):
+    with open(baseline_path) as f:
+        baseline = {(r['target'], r['scenario']): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['target'], result['scenario']))
+        if previous is None:
+            continue
+        throughput_change = result['validationsPerSecond'] / previous['validationsPerSecond'] - 1
+        p99_change = result['p99Ms'] / previous['p99Ms'] - 1 if previous['p99Ms'] else 0.0
+        status = 'ok'
+        if throughput_change < -max_regression or p99_change > max_regression:
+            status = 'REGRESSION'
+            regressions.append(result)
+        print('{:<10} {:<16} throughput {:+.1%}  p99 {:+.1%}  {}'.format(
+            result['target'], result['scenario'], throughput_change, p99_change, status))
+    return regressions
+
+
+def main():
+    args = parse_args()
+    factory = CognitoTokenFactory()
+    custom_authorizer = load_authorizer(factory, args.jwks_latency_ms, args.engine)
+
+    results = [run_scenario(target, scenario, args, factory, custom_authorizer)
+               for target in args.targets for scenario in args.scenarios]
+    print_results(results)
+
+    report = {
+        'python': sys.version.split()[0],
+        'iterations': args.iterations,
+        'engine': args.engine,
+        'jwksLatencyMs': args.jwks_latency_ms,
+        'results': results,
+    }
+    for path in (args.json_path, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        print()
+        if compare_with_baseline(results, args.baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Locally generated RSA keys and Cognito-shaped tokens, so the authorizer can be
+exercised without a real user pool."""
+
+import time
+import uuid
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+class CognitoTokenFactory:
+    def __init__(self, region='us-east-1', user_pool_id='us-east-1_benchmark',
+                 client_id='benchmarkclientid', key_count=2, key_size=2048):
+        self.region = region
+        self.user_pool_id = user_pool_id
+        self.client_id = client_id
+        self.issuer = 'https://cognito-idp.{}.amazonaws.com/{}'.format(region, user_pool_id)
+        self._keys = [self._generate_key('key-{}'.format(i), key_size) for i in range(key_count)]
+        # signs tokens whose kid is not published in the JWKS
+        self._foreign_key = self._generate_key('unknown-kid', key_size)
+
+    def idp_details(self):
+        return {'idp': {'name': 'Cognito', 'userPoolId': self.user_pool_id, 'clientId': self.client_id}}
+
+    def jwks(self):
+        """Returns the 'keys' list of the jwks.json document of the fake pool."""
+        return [dict(key['public']) for key in self._keys]
+
+    def id_token(self, role='SystemAdmin', expires_in=3600, key_index=0, **claims):
+        payload = {
+            'sub': str(uuid.uuid4()),
+            'cognito:username': 'user-' + uuid.uuid4().hex[:8],
+            'custom:userRole': role,
+            'email': 'benchmark@example.com',
+            'aud': self.client_id,
+            'iss': self.issuer,
+            'token_use': 'id',
+            'auth_time': int(time.time()),
+            'iat': int(time.time()),
+            'exp': int(time.time()) + expires_in,
+        }
+        payload.update(claims)
+        return self._sign(payload, self._keys[key_index])
+
+    def access_token(self, expires_in=3600, key_index=0, **claims):
+        payload = {
+            'sub': str(uuid.uuid4()),
+            'username': 'user-' + uuid.uuid4().hex[:8],
+            'client_id': self.client_id,
+            'iss': self.issuer,
+            'token_use': 'access',
+            'scope': 'openid email',
+            'iat': int(time.time()),
+            'exp': int(time.time()) + expires_in,
+        }
+        payload.update(claims)
+        return self._sign(payload, self._keys[key_index])
+
+    def expired_id_token(self, **claims):
+        return self.id_token(expires_in=-60, **claims)
+
+    def wrong_audience_id_token(self, **claims):
+        return self.id_token(aud='someotherclientid', **claims)
+
+    def unknown_kid_id_token(self, **claims):
+        payload = {
+            'sub': str(uuid.uuid4()),
+            'cognito:username': 'user-' + uuid.uuid4().hex[:8],
+            'custom:userRole': 'SystemAdmin',
+            'aud': self.client_id,
+            'iss': self.issuer,
+            'token_use': 'id',
+            'exp': int(time.time()) + 3600,
+        }
+        payload.update(claims)
+        return self._sign(payload, self._foreign_key)
+
+    @staticmethod
+    def _generate_key(kid, key_size):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()).decode('utf-8')
+        public = jwk.construct(pem, 'RS256').public_key().to_dict()
+        public.update({'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+        return {'kid': kid, 'private': pem, 'public': public}
+
+    @staticmethod
+    def _sign(payload, key):
+        return jwt.encode(payload, key['private'], algorithm='RS256', headers={'kid': key['kid']})
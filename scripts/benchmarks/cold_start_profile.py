@@ -0,0 +1,147 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Import-time profile of every Lambda handler entry point.
+
+Each handler module is imported in a fresh interpreter with `python -X importtime`
+and stub environment variables (no AWS calls are made while importing), and the
+per-module import cost is reported.
+
+    python scripts/benchmarks/cold_start_profile.py
+    python scripts/benchmarks/cold_start_profile.py --lazy --top 15
+    python scripts/benchmarks/cold_start_profile.py --lazy --save-budget budget.json
+    python scripts/benchmarks/cold_start_profile.py --lazy --budget budget.json --tolerance 0.25
+
+With --budget the script exits with status 1 if the init time of any handler
+exceeds its budgeted value by more than --tolerance."""
+
+import argparse
+import json
+import os
+import subprocess  # nosec B404 # only runs the current interpreter on handler modules of this repo
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+FUNCTIONS_DIR = os.path.join(REPO_ROOT, 'resources', 'functions')
+LAYERS_DIR = os.path.join(REPO_ROOT, 'resources', 'layers')
+
+# handler name -> (directory holding the module, module name, uses the control plane layer)
+HANDLERS = {
+    'custom_authorizer': (FUNCTIONS_DIR, 'custom_authorizer', True),
+    'tenant_management': (FUNCTIONS_DIR, 'tenant_management', True),
+    'user_management': (FUNCTIONS_DIR, 'user_management', True),
+    'initiate_onboarding': (FUNCTIONS_DIR, 'initiate_onboarding', True),
+    'provision_onboarding': (FUNCTIONS_DIR, 'provision_onboarding', True),
+    'complete_onboarding': (FUNCTIONS_DIR, 'complete_onboarding', True),
+    'error_handler': (FUNCTIONS_DIR, 'error_handler', True),
+    'onboarding_events_handler': (FUNCTIONS_DIR, 'onboarding_events_handler', True),
+    'tenant_config': (os.path.join(FUNCTIONS_DIR, 'tenant-config'), 'index', False),
+}
+
+STUB_ENVIRONMENT = {
+    'AWS_REGION': 'us-east-1',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'profiling',
+    'AWS_SECRET_ACCESS_KEY': 'profiling',
+    'POWERTOOLS_LOG_LEVEL': 'CRITICAL',
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'EVENTBUS_NAME': 'profiling-bus',
+    'EVENT_SOURCE': 'profiling',
+    'TENANT_DETAILS_TABLE': 'profiling-tenant-details',
+    'TENANT_CONFIG_INDEX_NAME': 'tenantConfigIndex',
+    'TENANT_NAME_COLUMN': 'tenantName',
+    'TENANT_CONFIG_COLUMN': 'tenantConfig',
+    'ONBOARDING_STATE_MACHINE_ARN': 'arn:aws:states:us-east-1:123456789012:stateMachine:profiling',
+    'IDP_NAME': 'COGNITO',
+    'IDP_DETAILS': json.dumps({'idp': {'name': 'Cognito', 'userPoolId': 'us-east-1_profiling', 'clientId': 'profiling'}}),
+    'SYS_ADMIN_ROLE_NAME': 'SystemAdmin',
+}
+
+IMPORT_SNIPPET = '''
+import time
+started = time.perf_counter()
+import {module}
+print('INIT_MS', (time.perf_counter() - started) * 1000)
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--handlers', nargs='+', choices=sorted(HANDLERS), default=sorted(HANDLERS))
+    parser.add_argument('--lazy', action='store_true', help='profile with LAZY_INIT=true')
+    parser.add_argument('--top', type=int, default=10, help='number of most expensive modules listed per handler')
+    parser.add_argument('--runs', type=int, default=3, help='imports per handler, the fastest one is reported')
+    parser.add_argument('--json', dest='json_path', help='write the results to this file')
+    parser.add_argument('--save-budget', help='write the measured init times as a budget to this file')
+    parser.add_argument('--budget', help='fail if a handler exceeds the init time recorded in this budget file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='tolerated relative excess over the budget (default 0.25)')
+    return parser.parse_args()
+
+
+def profile_handler(name, lazy):
+    directory, module, uses_layer = HANDLERS[name]
+    env = dict(os.environ, **STUB_ENVIRONMENT)
+    env['LAZY_INIT'] = 'true' if lazy else 'false'
+    env['PYTHONPATH'] = os.pathsep.join([directory] + ([LAYERS_DIR] if uses_layer else []))
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    completed = subprocess.run(  # nosec B603 # fixed argument list, no shell
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SNIPPET.format(module=module)],
+        env=env, cwd=directory, capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        raise RuntimeError('Importing {} failed:\n{}'.format(name, completed.stderr[-2000:]))
+
+    init_ms = next(float(line.split()[1]) for line in completed.stdout.splitlines() if line.startswith('INIT_MS'))
+    return init_ms, parse_importtime(completed.stderr, module)
+
+
+def parse_importtime(stderr, module):
+    """Returns {top level module: cumulative import ms} from -X importtime output, whose
+    lines look like 'import time:      self [us] | cumulative | imported package'. The cost
+    of a package includes the submodules and dependencies it pulls in on import."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        name = name.strip()
+        if '.' in name or name == module:
+            continue
+        modules[name] = int(cumulative_us) / 1000.0
+    return modules
+
+
+def main():
+    args = parse_args()
+    results = []
+    for name in args.handlers:
+        runs = [profile_handler(name, args.lazy) for _ in range(args.runs)]
+        init_ms, modules = min(runs, key=lambda run: run[0])
+        results.append({'handler': name, 'initMs': init_ms, 'modules': modules})
+
+        print('{} ({}): {:.1f} ms'.format(name, 'lazy' if args.lazy else 'eager', init_ms))
+        for imported, cost in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+            print('    {:<32} {:>8.1f} ms'.format(imported, cost))
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'lazy': args.lazy, 'results': results}, f, indent=2)
+    if args.save_budget:
+        with open(args.save_budget, 'w') as f:
+            json.dump({r['handler']: round(r['initMs'], 1) for r in results}, f, indent=2)
+
+    if args.budget:
+        with open(args.budget) as f:
+            budget = json.load(f)
+        over_budget = [r for r in results
+                       if r['handler'] in budget and r['initMs'] > budget[r['handler']] * (1 + args.tolerance)]
+        for result in over_budget:
+            print('OVER BUDGET {}: {:.1f} ms > {:.1f} ms'.format(
+                result['handler'], result['initMs'], budget[result['handler']]))
+        if over_budget:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Runs every JWT verification engine over a shared corpus of valid, invalid and
+malformed Cognito-shaped tokens and checks that all engines reach the same
+accept/reject decision, and the expected one, for every token.
+
+    python scripts/benchmarks/jwt_conformance.py
+
+Exits with status 1 on any disagreement."""
+
+import base64
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'resources', 'layers'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cognito_tokens import CognitoTokenFactory  # noqa: E402
+
+ENGINES = ['cryptography', 'jose']
+
+
+def _b64(data):
+    if not isinstance(data, bytes):
+        data = json.dumps(data).encode('utf-8')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _replace_segment(token, index, value):
+    segments = token.split('.')
+    segments[index] = value
+    return '.'.join(segments)
+
+
+def build_corpus(factory):
+    """Returns a list of (name, token, expected_accept)."""
+    valid = factory.id_token()
+    header, payload, signature = valid.split('.')
+    return [
+        ('valid id token', valid, True),
+        ('valid access token', factory.access_token(), True),
+        ('valid id token, second key', factory.id_token(key_index=1), True),
+        ('expired', factory.expired_id_token(), False),
+        ('wrong audience', factory.wrong_audience_id_token(), False),
+        ('access token with wrong client_id', factory.access_token(client_id='other'), False),
+        ('wrong issuer', factory.id_token(iss='https://cognito-idp.us-east-1.amazonaws.com/other'), False),
+        ('unknown token_use', factory.id_token(token_use='refresh'), False),
+        ('missing exp', factory.id_token(exp=None), False),
+        ('string exp', factory.id_token(exp='9999999999'), False),
+        ('unknown kid', factory.unknown_kid_id_token(), False),
+        ('tampered payload', _replace_segment(valid, 1, _b64(
+            dict(json.loads(base64.urlsafe_b64decode(payload + '==')), **{'custom:userRole': 'Other'}))), False),
+        ('tampered signature', _replace_segment(valid, 2, signature[::-1]), False),
+        ('signature of another token', _replace_segment(valid, 2, factory.id_token().split('.')[2]), False),
+        ('empty signature', _replace_segment(valid, 2, ''), False),
+        ('alg none', _replace_segment(valid, 0, _b64({'alg': 'none', 'kid': 'key-0'})), False),
+        ('alg HS256', _replace_segment(valid, 0, _b64({'alg': 'HS256', 'kid': 'key-0'})), False),
+        ('missing kid', _replace_segment(valid, 0, _b64({'alg': 'RS256'})), False),
+        ('non-string kid', _replace_segment(valid, 0, _b64({'alg': 'RS256', 'kid': ['key-0']})), False),
+        ('header is a list', _replace_segment(valid, 0, _b64([1, 2])), False),
+        ('payload is a string', _replace_segment(valid, 1, _b64('claims')), False),
+        ('header is not json', _replace_segment(valid, 0, _b64(b'not json')), False),
+        ('payload is not json', _replace_segment(valid, 1, _b64(b'\xff\xfe')), False),
+        ('two segments', header + '.' + payload, False),
+        ('one segment', header, False),
+        ('four segments', valid + '.' + signature, False),
+        ('empty', '', False),
+        ('garbage', 'Bearer-not-a-token', False),
+    ]
+
+
+def main():
+    factory = CognitoTokenFactory()
+    os.environ.setdefault('AWS_DEFAULT_REGION', factory.region)
+    os.environ.setdefault('POWERTOOLS_LOG_LEVEL', 'CRITICAL')
+
+    import idp_object_factory
+    from cognito.cognito_authorizer import CognitoAuthorizer
+
+    jwks = factory.jwks()
+    authorizers = {}
+    for engine in ENGINES:
+        authorizer = CognitoAuthorizer(idp_object_factory.get_jwt_verifier_object(engine))
+        authorizer.jwks_cache.fetcher = lambda user_pool_id: jwks
+        authorizers[engine] = authorizer
+
+    failures = 0
+    for name, token, expected in build_corpus(factory):
+        decisions = {}
+        for engine, authorizer in authorizers.items():
+            decisions[engine] = authorizer.validateJWT(
+                {'jwtToken': token, 'idpDetails': factory.idp_details()}) is not False
+        agreed = len(set(decisions.values())) == 1 and decisions[ENGINES[0]] == expected
+        failures += not agreed
+        print('{:<4} {:<40} expected={:<6} {}'.format(
+            'ok' if agreed else 'FAIL', name, 'accept' if expected else 'reject',
+            ' '.join('{}={}'.format(engine, 'accept' if accepted else 'reject')
+                     for engine, accepted in decisions.items())))
+
+    if failures:
+        print('{} token(s) with diverging or unexpected decisions'.format(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
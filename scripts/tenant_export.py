@@ -0,0 +1,53 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Exports every tenant of the TenantDetails table as NDJSON with a parallel scan.
+
+    python scripts/tenant_export.py --table <TenantDetails table> --output tenants.ndjson
+    python scripts/tenant_export.py --table <table> --output tenants.ndjson --checkpoint export.checkpoint
+    python scripts/tenant_export.py --table <table> --segments 16 --workers 8 > tenants.ndjson
+
+Run again with the same --checkpoint to resume an interrupted export. Credentials and
+region come from the usual AWS environment/configuration."""
+
+import argparse
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'resources', 'layers'))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.environ.get('TENANT_DETAILS_TABLE'),
+                        required=not os.environ.get('TENANT_DETAILS_TABLE'),
+                        help='name of the TenantDetails table (default: $TENANT_DETAILS_TABLE)')
+    parser.add_argument('--output', default='-', help='NDJSON file to write, - for stdout (default)')
+    parser.add_argument('--segments', type=int, help='total parallel scan segments')
+    parser.add_argument('--workers', type=int, help='segments scanned concurrently')
+    parser.add_argument('--page-size', type=int, help='items per scan request')
+    parser.add_argument('--checkpoint', help='checkpoint file used to resume an interrupted export')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # the layer logs to stdout, which may be carrying the export itself
+    os.environ.setdefault('POWERTOOLS_LOG_LEVEL', 'WARNING')
+    from dynamodb.tenant_export import export_tenants
+
+    stats = export_tenants(
+        sys.stdout if args.output == '-' else args.output,
+        table_name=args.table,
+        total_segments=args.segments,
+        max_workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        page_size=args.page_size,
+        progress_callback=lambda progress: print(json.dumps(progress), file=sys.stderr))
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
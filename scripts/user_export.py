@@ -0,0 +1,53 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Exports every user of a Cognito user pool as NDJSON, listing disjoint shards of the
+pool in parallel.
+
+    python scripts/user_export.py --user-pool-id <user pool id> --output users.ndjson
+    python scripts/user_export.py --user-pool-id <id> --output users.ndjson --checkpoint export.checkpoint
+    python scripts/user_export.py --user-pool-id <id> --prefix-length 2 --workers 8 > users.ndjson
+
+Run again with the same --checkpoint to resume an interrupted export. Credentials and
+region come from the usual AWS environment/configuration."""
+
+import argparse
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'resources', 'layers'))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--user-pool-id', required=True, help='id of the Cognito user pool')
+    parser.add_argument('--output', default='-', help='NDJSON file to write, - for stdout (default)')
+    parser.add_argument('--prefix-length', type=int,
+                        help='hex digits of the sub prefix per shard, 1 gives 16 shards and 2 gives 256')
+    parser.add_argument('--workers', type=int, help='shards listed concurrently')
+    parser.add_argument('--rate', type=float, help='list_users calls per second across all workers')
+    parser.add_argument('--checkpoint', help='checkpoint file used to resume an interrupted export')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # the layer logs to stdout, which may be carrying the export itself
+    os.environ.setdefault('POWERTOOLS_LOG_LEVEL', 'WARNING')
+    from cognito.user_export import export_users
+
+    stats = export_users(
+        sys.stdout if args.output == '-' else args.output,
+        args.user_pool_id,
+        shard_prefix_length=args.prefix_length,
+        max_workers=args.workers,
+        rate_per_second=args.rate,
+        checkpoint_path=args.checkpoint,
+        progress_callback=lambda progress: print(json.dumps(progress), file=sys.stderr))
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,7 @@ import {
   Effect,
 } from 'aws-cdk-lib/aws-iam';
 import { Runtime, IFunction } from 'aws-cdk-lib/aws-lambda';
+import { Secret } from 'aws-cdk-lib/aws-secretsmanager';
 import { NagSuppressions } from 'cdk-nag';
 import { Construct } from 'constructs';
 import { LambdaLayers } from './lambda-layers';
@@ -191,6 +192,8 @@ export class CognitoAuth extends Construct implements IAuth {
           'cognito-idp:AdminDisableUser',
           'cognito-idp:AdminAddUserToGroup',
           'cognito-idp:GetGroup',
+          'cognito-idp:ListGroups',
+          'cognito-idp:AdminListGroupsForUser',
           'cognito-idp:AdminUpdateUserAttributes',
           'cognito-idp:AdminGetUser',
           'cognito-idp:ListUsers',
@@ -221,6 +224,21 @@ export class CognitoAuth extends Construct implements IAuth {
       true
     );
 
+    // signs the nextToken of paginated user listings so clients cannot tamper with it
+    const userPaginationTokenSecret = new Secret(this, 'userPaginationTokenSecret', {
+      generateSecretString: {
+        excludePunctuation: true,
+        passwordLength: 64,
+      },
+    });
+    userPaginationTokenSecret.grantRead(userManagementExecRole);
+    NagSuppressions.addResourceSuppressions(userPaginationTokenSecret, [
+      {
+        id: 'AwsSolutions-SMG4',
+        reason: 'Only signs short-lived pagination tokens; rotating it would invalidate open cursors.',
+      },
+    ]);
+
     const userManagementServices = new PythonFunction(this, 'UserManagementServices', {
       entry: path.join(__dirname, '../../resources/functions/'),
       runtime: Runtime.PYTHON_3_12,
@@ -232,6 +250,7 @@ export class CognitoAuth extends Construct implements IAuth {
       environment: {
         IDP_NAME: props.idpName,
         IDP_DETAILS: this.controlPlaneIdpDetails,
+        PAGINATION_TOKEN_SECRET_ARN: userPaginationTokenSecret.secretArn,
       },
     });
 
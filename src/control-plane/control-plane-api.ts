@@ -127,6 +127,29 @@ export class ControlPlaneAPI extends Construct {
       }
     );
 
+    const tenantsBatchResource = tenants.addResource('batch');
+    tenantsBatchResource.addMethod(
+      'POST',
+      new apigateway.LambdaIntegration(props.services.tenantManagementServices),
+      {
+        authorizationType: apigateway.AuthorizationType.CUSTOM,
+        authorizer: props.auth.authorizer,
+      }
+    );
+
+    const tenantsBatchLifecycleResources = ['activate', 'deactivate', 'offboard'].map((operation) => {
+      const resource = tenantsBatchResource.addResource(operation);
+      resource.addMethod(
+        'POST',
+        new apigateway.LambdaIntegration(props.services.tenantManagementServices),
+        {
+          authorizationType: apigateway.AuthorizationType.CUSTOM,
+          authorizer: props.auth.authorizer,
+        }
+      );
+      return resource;
+    });
+
     const tenantIdResource = tenants.addResource('{tenantId}');
     tenantIdResource.addMethod(
       'DELETE',
@@ -199,6 +222,12 @@ export class ControlPlaneAPI extends Construct {
         `${tenants}/OPTIONS/Resource`,
         `${tenants}/GET/Resource`,
         `${tenants}/POST/Resource`,
+        `${tenantsBatchResource}/OPTIONS/Resource`,
+        `${tenantsBatchResource}/POST/Resource`,
+        ...tenantsBatchLifecycleResources.flatMap((resource) => [
+          `${resource}/OPTIONS/Resource`,
+          `${resource}/POST/Resource`,
+        ]),
         `${tenantIdResource}/OPTIONS/Resource`,
         `${tenantIdResource}/DELETE/Resource`,
         `${tenantIdResource}/GET/Resource`,
@@ -221,6 +250,8 @@ export class ControlPlaneAPI extends Construct {
       cdk.Stack.of(this),
       [
         `${tenants}/OPTIONS/Resource`,
+        `${tenantsBatchResource}/OPTIONS/Resource`,
+        ...tenantsBatchLifecycleResources.map((resource) => `${resource}/OPTIONS/Resource`),
         `${tenantIdResource}/OPTIONS/Resource`,
         `${deactivateTenantResource}/OPTIONS/Resource`,
         `${activateTenantResource}/OPTIONS/Resource`,
@@ -243,6 +274,16 @@ export class ControlPlaneAPI extends Construct {
       authorizer: props.auth.authorizer,
     });
 
+    const usersBatchResource = users.addResource('batch');
+    usersBatchResource.addMethod(
+      'POST',
+      new apigateway.LambdaIntegration(props.auth.createUserFunction),
+      {
+        authorizationType: apigateway.AuthorizationType.CUSTOM,
+        authorizer: props.auth.authorizer,
+      }
+    );
+
     const userNameResource = users.addResource('{username}');
     userNameResource.addMethod(
       'GET',
@@ -295,6 +336,8 @@ export class ControlPlaneAPI extends Construct {
         `${users}/OPTIONS/Resource`,
         `${users}/GET/Resource`,
         `${users}/POST/Resource`,
+        `${usersBatchResource}/OPTIONS/Resource`,
+        `${usersBatchResource}/POST/Resource`,
         `${userNameResource}/OPTIONS/Resource`,
         `${userNameResource}/DELETE/Resource`,
         `${userNameResource}/GET/Resource`,
@@ -317,6 +360,7 @@ export class ControlPlaneAPI extends Construct {
       cdk.Stack.of(this),
       [
         `${users}/OPTIONS/Resource`,
+        `${usersBatchResource}/OPTIONS/Resource`,
         `${userNameResource}/OPTIONS/Resource`,
         `${disableUserResource}/OPTIONS/Resource`,
         `${enableUserResource}/OPTIONS/Resource`,
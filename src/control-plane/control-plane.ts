@@ -60,6 +60,7 @@ export class ControlPlane extends Construct {
 
     const tenantConfigService = new TenantConfigService(this, 'auth-info-service-stack', {
       tenantDetails: tables.tenantDetails,
+      tenantHostnames: tables.tenantHostnames,
       tenantDetailsTenantNameColumn: tables.tenantNameColumn,
       tenantConfigIndexName: tables.tenantConfigIndexName,
       tenantDetailsTenantConfigColumn: tables.tenantConfigColumn,
@@ -44,6 +44,7 @@ export class OnboardingStepFunctions extends Construct {
       ManagedPolicy.fromAwsManagedPolicyName('AWSXrayWriteOnlyAccess')
     );
     props.tables.tenantDetails.grantReadWriteData(lambdaExecRole);
+    props.tables.tenantHostnames.grantReadWriteData(lambdaExecRole);
     props.eventBus.grantPutEventsTo(lambdaExecRole);
     NagSuppressions.addResourceSuppressions(
       lambdaExecRole,
@@ -81,6 +82,7 @@ export class OnboardingStepFunctions extends Construct {
         EVENTBUS_NAME: props.eventBus.eventBusName,
         EVENT_SOURCE: props.controlPlaneEventSource,
         TENANT_DETAILS_TABLE: props.tables.tenantDetails.tableName,
+        TENANT_HOSTNAMES_TABLE: props.tables.tenantHostnames.tableName,
       },
     });
 
@@ -7,6 +7,7 @@ import { aws_iam, Duration } from 'aws-cdk-lib';
 import { EventBus } from 'aws-cdk-lib/aws-events';
 import { Role, ServicePrincipal, ManagedPolicy } from 'aws-cdk-lib/aws-iam';
 import { Runtime, LayerVersion, Function } from 'aws-cdk-lib/aws-lambda';
+import { Secret } from 'aws-cdk-lib/aws-secretsmanager';
 import { NagSuppressions } from 'cdk-nag';
 import { Construct } from 'constructs';
 import { Tables } from './tables';
@@ -32,6 +33,7 @@ export class Services extends Construct {
     });
 
     props.tables.tenantDetails.grantReadWriteData(tenantManagementExecRole);
+    props.tables.tenantHostnames.grantReadWriteData(tenantManagementExecRole);
     props.eventBus.grantPutEventsTo(tenantManagementExecRole);
 
     tenantManagementExecRole.addManagedPolicy(
@@ -71,6 +73,21 @@ export class Services extends Construct {
       true // applyToChildren = true, so that it applies to policies created for the role.
     );
 
+    // signs the nextToken of paginated listings so clients cannot tamper with it
+    const paginationTokenSecret = new Secret(this, 'paginationTokenSecret', {
+      generateSecretString: {
+        excludePunctuation: true,
+        passwordLength: 64,
+      },
+    });
+    paginationTokenSecret.grantRead(tenantManagementExecRole);
+    NagSuppressions.addResourceSuppressions(paginationTokenSecret, [
+      {
+        id: 'AwsSolutions-SMG4',
+        reason: 'Only signs short-lived pagination tokens; rotating it would invalidate open cursors.',
+      },
+    ]);
+
     const tenantManagementServices = new PythonFunction(this, 'TenantManagementServices', {
       entry: path.join(__dirname, '../../resources/functions/'),
       runtime: Runtime.PYTHON_3_12,
@@ -83,7 +100,9 @@ export class Services extends Construct {
         EVENTBUS_NAME: props.eventBus.eventBusName,
         EVENT_SOURCE: props.controlPlaneEventSource,
         TENANT_DETAILS_TABLE: props.tables.tenantDetails.tableName,
+        TENANT_HOSTNAMES_TABLE: props.tables.tenantHostnames.tableName,
         ONBOARDING_STATE_MACHINE_ARN: props.onboardingStateMachineArn,
+        PAGINATION_TOKEN_SECRET_ARN: paginationTokenSecret.secretArn,
       },
     });
 
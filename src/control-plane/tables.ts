@@ -6,12 +6,14 @@ import { Construct } from 'constructs';
 
 export class Tables extends Construct {
   public readonly tenantDetails: Table;
+  public readonly tenantHostnames: Table;
   public readonly tenantConfigIndexName: string = 'tenantConfigIndex';
 
   // note that only the attributes included in this list will be returned when querying the tenant config endpoint
   public readonly tenantConfigColumn: string = 'tenantConfig';
   public readonly tenantNameColumn: string = 'tenantName';
   public readonly tenantIdColumn: string = 'tenantId';
+  public readonly tenantHostnameColumn: string = 'hostname';
   constructor(scope: Construct, id: string) {
     super(scope, id);
 
@@ -26,5 +28,11 @@ export class Tables extends Construct {
       projectionType: ProjectionType.INCLUDE,
       nonKeyAttributes: [this.tenantConfigColumn],
     });
+
+    // maps each hostname of a tenant, custom domains included, to a copy of its tenant config
+    this.tenantHostnames = new Table(this, 'TenantHostnames', {
+      partitionKey: { name: this.tenantHostnameColumn, type: AttributeType.STRING },
+      pointInTimeRecovery: true,
+    });
   }
 }
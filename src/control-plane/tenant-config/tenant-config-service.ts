@@ -11,6 +11,7 @@ import { Construct } from 'constructs';
 
 export interface TenantConfigServiceProps {
   readonly tenantDetails: Table;
+  readonly tenantHostnames: Table;
   readonly tenantConfigIndexName: string;
   readonly tenantDetailsTenantNameColumn: string;
   readonly tenantDetailsTenantConfigColumn: string;
@@ -40,6 +41,7 @@ export class TenantConfigService extends Construct {
           TENANT_CONFIG_INDEX_NAME: props.tenantConfigIndexName,
           TENANT_NAME_COLUMN: props.tenantDetailsTenantNameColumn,
           TENANT_CONFIG_COLUMN: props.tenantDetailsTenantConfigColumn,
+          TENANT_HOSTNAMES_TABLE: props.tenantHostnames.tableName,
         },
         logRetention: cdk.aws_logs.RetentionDays.FIVE_DAYS,
         layers: [
@@ -53,6 +55,7 @@ export class TenantConfigService extends Construct {
     );
 
     props.tenantDetails.grantReadData(this.tenantConfigServiceLambda);
+    props.tenantHostnames.grantReadData(this.tenantConfigServiceLambda);
 
     NagSuppressions.addResourceSuppressions(
       this.tenantConfigServiceLambda.role!,